@@ -0,0 +1,36 @@
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create datastream entry hashes table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a0d1f1e6b4c2'
+down_revision = 'e1146238edd3'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'vocabularies_datastream_hashes',
+        sa.Column('namespace', sa.String(), nullable=False),
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            'namespace', 'id',
+            name=op.f('pk_vocabularies_datastream_hashes')
+        )
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('vocabularies_datastream_hashes')
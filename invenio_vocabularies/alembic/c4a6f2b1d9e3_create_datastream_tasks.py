@@ -0,0 +1,40 @@
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create datastream tasks table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4a6f2b1d9e3'
+down_revision = 'a0d1f1e6b4c2'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'vocabularies_datastream_tasks',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('errored', sa.Integer(), nullable=False),
+        sa.Column('filtered', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('started', sa.DateTime(), nullable=True),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.Column('finished', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint(
+            'id', name=op.f('pk_vocabularies_datastream_tasks')
+        )
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('vocabularies_datastream_tasks')
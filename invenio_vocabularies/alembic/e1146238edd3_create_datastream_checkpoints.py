@@ -0,0 +1,34 @@
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create datastream checkpoints table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e1146238edd3'
+down_revision = '17c703ce1eb7'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'vocabularies_datastream_checkpoints',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('position', sa.Text(), nullable=True),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            'id', name=op.f('pk_vocabularies_datastream_checkpoints')
+        )
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('vocabularies_datastream_checkpoints')
@@ -9,7 +9,12 @@
 
 """Commands to create and manage vocabularies."""
 
+import asyncio
+import sys
+import time
+from collections import Counter
 from copy import deepcopy
+from datetime import timedelta
 
 import click
 import yaml
@@ -20,6 +25,7 @@ from invenio_records_resources.proxies import current_service_registry
 
 from .contrib.names.datastreams import DATASTREAM_CONFIG as names_ds_config
 from .datastreams import DataStreamFactory
+from .datastreams.instrumentation import StatsCollector
 
 
 def get_config_for_ds(vocabulary, filepath=None, origin=None):
@@ -46,32 +52,239 @@ def vocabularies():
     """Vocabularies command."""
 
 
-def _process_vocab(config, num_samples=None):
-    """Import a vocabulary."""
+class ProgressReporter:
+    """Reports the progress of a data stream run in the terminal.
+
+    The output is refreshed at most every `interval` seconds, and only if
+    the error output is a terminal.
+    """
+
+    def __init__(self, total=None, interval=1):
+        """Constructor."""
+        self.total = total
+        self.processed = 0
+        self._interval = interval
+        self._start = self._last = time.monotonic()
+        self._enabled = sys.stderr.isatty()
+
+    def count_total(self, datastream):
+        """Count the total of entries, if it is cheap.
+
+        Counting by reading the whole origin would double the work of the
+        run, so the progress is then reported without an ETA.
+        """
+        if not self._enabled or not datastream.total_is_cheap():
+            return
+        try:
+            self.total = datastream.total()
+        except NotImplementedError:
+            pass
+
+    def update(self, processed=1):
+        """Adds processed entries, refreshing the output if needed."""
+        self.processed += processed
+        now = time.monotonic()
+        if now - self._last >= self._interval:
+            self._last = now
+            self._render(now)
+
+    def finish(self):
+        """Outputs the final progress."""
+        if self._enabled:
+            self._render(time.monotonic())
+            click.echo(err=True)
+
+    def _render(self, now):
+        """Outputs the progress line."""
+        if not self._enabled:
+            return
+        elapsed = now - self._start
+        rate = self.processed / elapsed if elapsed else 0
+        total = f"/{self.total}" if self.total is not None else ""
+        line = f"Processed {self.processed}{total} entries ({rate:.1f}/s"
+        if self.total is not None and rate:
+            left = max(self.total - self.processed, 0)
+            line += f", ETA {timedelta(seconds=int(left / rate))}"
+        click.echo(f"\r{line})", nl=False, err=True)
+
+
+def _process_vocab(config, num_samples=None, **kwargs):
+    """Import a vocabulary.
+
+    Extra keyword arguments are passed to the data stream. The time spent
+    in each stage is output at the end, and in dry run mode the most common
+    errors.
+    """
+    stats = StatsCollector()
     ds = DataStreamFactory.create(
         reader_config=config["reader"],
         transformers_config=config.get("transformers"),
         writers_config=config["writers"],
+        filters_config=config.get("filters"),
+        instrumentation=stats,
+        **kwargs
     )
 
+    progress = ProgressReporter(total=num_samples)
+    if not num_samples:
+        progress.count_total(ds)
+
     success, errored, filtered = 0, 0, 0
+    errors = Counter()
     left = num_samples or -1
-    for result in ds.process():
+    for result in _iterate(ds.process()):
+        progress.update()
         left = left - 1
         if result.filtered:
             filtered += 1
         if result.errors:
             for err in result.errors:
-                click.secho(err, fg="red")
+                if kwargs.get("dry_run"):
+                    errors[err] += 1
+                else:
+                    click.secho(err, fg="red")
             errored += 1
         else:
             success += 1
         if left == 0:
             click.secho(f"Number of samples reached {num_samples}", fg="green")
             break
+
+    progress.finish()
+    click.echo(stats.summary())
+    if errors:
+        _output_errors(errors)
     return success, errored, filtered
 
 
+def _iterate(results):
+    """Iterates over the results of a data stream.
+
+    The results of asynchronous data streams are awaited in an event loop
+    running while the next result is not ready.
+    """
+    if not hasattr(results, "__anext__"):
+        yield from results
+        return
+
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+
+def _output_errors(errors, limit=20):
+    """Outputs the distribution of the most common errors."""
+    total = sum(errors.values())
+    click.secho(
+        f"{len(errors)} distinct errors, the most common ones:", fg="red"
+    )
+    for err, count in errors.most_common(limit):
+        click.secho(f"{count:>10} ({count / total:6.1%})  {err}", fg="red")
+
+
+def datastream_options(f):
+    """Options to tune how the entries are processed."""
+    options = [
+        click.option(
+            "-b",
+            "--batch-size",
+            type=click.IntRange(min=1),
+            help="Number of entries to write at once."
+        ),
+        click.option(
+            "-w",
+            "--transform-workers",
+            type=click.IntRange(min=1),
+            help="Number of processes used to transform the entries."
+        ),
+        click.option(
+            "--pipelined",
+            is_flag=True,
+            default=False,
+            help="Read, transform and write the entries concurrently."
+        ),
+        click.option(
+            "--async",
+            "asynchronous",
+            is_flag=True,
+            default=False,
+            help="Transform and write many entries at once in an event loop."
+        ),
+        click.option(
+            "--concurrent-writers",
+            is_flag=True,
+            default=False,
+            help="Run the writers of each entry at the same time."
+        ),
+        click.option(
+            "--retries",
+            type=click.IntRange(min=1),
+            help="Maximum attempts of writes failing with a transient error."
+        ),
+        click.option(
+            "--dry-run",
+            is_flag=True,
+            default=False,
+            help="Only validate the entries, nothing is written."
+        ),
+        click.option(
+            "--rate-limit",
+            type=click.FloatRange(min=0),
+            help="Maximum number of entries read per second."
+        ),
+        click.option(
+            "-c",
+            "--checkpoint",
+            type=click.Path(dir_okay=False),
+            help="File to save the progress to, and to resume from if it "
+                 "exists."
+        ),
+        click.option(
+            "--dead-letter",
+            type=click.Path(dir_okay=False),
+            help="Compressed JSON lines file to write the failed entries to."
+        ),
+        click.option(
+            "--replay",
+            type=click.Path(exists=True, dir_okay=False),
+            help="Process the failed entries of a dead letter file instead "
+                 "of the origin."
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+def _datastream_kwargs(
+    config, checkpoint=None, dead_letter=None, replay=None, retries=None,
+    rate_limit=None, **kwargs
+):
+    """Data stream arguments from the `datastream_options`."""
+    if replay:
+        config["reader"] = {"type": "dead-letter", "args": {"origin": replay}}
+    if checkpoint:
+        kwargs["checkpoint_config"] = {
+            "type": "file", "args": {"filepath": checkpoint}
+        }
+    if dead_letter:
+        kwargs["dead_letter_config"] = {
+            "type": "dead-letter", "args": {"filepath": dead_letter}
+        }
+    if retries:
+        kwargs["write_retry_config"] = {"max_attempts": retries}
+    if rate_limit:
+        config["reader"]["rate_limit"] = {"rate": rate_limit}
+    return kwargs
+
+
 def _output_process(vocabulary, op, success, errored, filtered):
     """Outputs the result of an operation."""
     total = success + errored
@@ -94,27 +307,42 @@ def _output_process(vocabulary, op, success, errored, filtered):
 @click.option("-f", "--filepath", type=click.STRING)
 @click.option("-o", "--origin", type=click.STRING)
 @click.option("-n", "--num-samples", type=click.INT)
+@datastream_options
 @with_appcontext
-def import_vocab(vocabulary, filepath=None, origin=None, num_samples=None):
+def import_vocab(
+    vocabulary, filepath=None, origin=None, num_samples=None, **kwargs
+):
     """Import a vocabulary."""
-    if not filepath and not origin:
+    if not filepath and not origin and not kwargs.get("replay"):
         click.secho("One of --filepath or --origin must be present", fg="red")
         exit(1)
 
     config = get_config_for_ds(vocabulary, filepath, origin)
-    success, errored, filtered = _process_vocab(config, num_samples)
+    success, errored, filtered = _process_vocab(
+        config, num_samples, **_datastream_kwargs(config, **kwargs)
+    )
 
-    _output_process(vocabulary, "imported", success, errored, filtered)
+    op = "validated" if kwargs.get("dry_run") else "imported"
+    _output_process(vocabulary, op, success, errored, filtered)
 
 
 @vocabularies.command()
 @click.option("-v", "--vocabulary", type=click.STRING, required=True)
 @click.option("-f", "--filepath", type=click.STRING)
 @click.option("-o", "--origin", type=click.STRING)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    default=False,
+    help="Skip the entries that did not change since they were last written."
+)
+@datastream_options
 @with_appcontext
-def update(vocabulary, filepath=None, origin=None):
+def update(
+    vocabulary, filepath=None, origin=None, skip_unchanged=False, **kwargs
+):
     """Import a vocabulary."""
-    if not filepath and not origin:
+    if not filepath and not origin and not kwargs.get("replay"):
         click.secho("One of --filepath or --origin must be present", fg="red")
         exit(1)
 
@@ -122,10 +350,15 @@ def update(vocabulary, filepath=None, origin=None):
 
     for w_conf in config["writers"]:
         w_conf["args"]["update"] = True
+        if skip_unchanged:
+            w_conf["args"]["skip_unchanged"] = True
 
-    success, errored, filtered = _process_vocab(config)
+    success, errored, filtered = _process_vocab(
+        config, **_datastream_kwargs(config, **kwargs)
+    )
 
-    _output_process(vocabulary, "updated", success, errored, filtered)
+    op = "validated" if kwargs.get("dry_run") else "updated"
+    _output_process(vocabulary, op, success, errored, filtered)
 
 
 @vocabularies.command()
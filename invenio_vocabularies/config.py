@@ -12,9 +12,6 @@
 import idutils
 from flask_babelex import lazy_gettext as _
 
-from .datastreams.readers import TarReader, YamlReader
-from .datastreams.transformers import XMLTransformer
-from .datastreams.writers import ServiceWriter, YamlWriter
 from .resources.resource import VocabulariesResourceConfig
 from .services.service import VocabulariesServiceConfig
 
@@ -63,19 +60,38 @@ VOCABULARIES_NAMES_SCHEMES = {
 }
 """Names allowed identifier schemes."""
 
-VOCABULARIES_DATASTREAM_READERS = {
-    "tar": TarReader,
-    "yaml": YamlReader,
-}
-"""Data Streams readers."""
+VOCABULARIES_DATASTREAM_READERS = {}
+"""Data Streams readers.
 
-VOCABULARIES_DATASTREAM_TRANSFORMERS = {
-    "xml": XMLTransformer,
-}
-"""Data Streams transformers."""
+Added to, or overriding, the ones registered in the
+``invenio_vocabularies.datastream.readers`` entry point group. Values can
+be classes or import strings, which are imported on first use.
+"""
 
-VOCABULARIES_DATASTREAM_WRITERS = {
-    "service": ServiceWriter,
-    "yaml": YamlWriter,
-}
-"""Data Streams writers."""
+VOCABULARIES_DATASTREAM_TRANSFORMERS = {}
+"""Data Streams transformers.
+
+Added to the ``invenio_vocabularies.datastream.transformers`` entry points.
+"""
+
+VOCABULARIES_DATASTREAM_WRITERS = {}
+"""Data Streams writers.
+
+Added to the ``invenio_vocabularies.datastream.writers`` entry points.
+"""
+
+VOCABULARIES_DATASTREAM_CHECKPOINT_STORES = {}
+"""Data Streams checkpoint stores.
+
+Added to the ``invenio_vocabularies.datastream.checkpoint_stores`` entry
+points.
+"""
+
+VOCABULARIES_DATASTREAM_FILTERS = {}
+"""Data Streams filters.
+
+Added to the ``invenio_vocabularies.datastream.filters`` entry points.
+"""
+
+VOCABULARIES_TASKS_PROGRESS_INTERVAL = 10
+"""Minimum number of seconds between updates of a task progress."""
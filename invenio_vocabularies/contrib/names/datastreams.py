@@ -23,14 +23,21 @@ from ...datastreams.writers import ServiceWriter
 class OrcidHTTPReader(SimpleHTTPReader):
     """ORCiD HTTP Reader."""
 
-    def __init__(self, *args, test_mode=True, **kwargs):
-        """Constructor."""
+    def __init__(
+        self, *args, test_mode=True, requests_per_second=24, **kwargs
+    ):
+        """Constructor.
+
+        :param requests_per_second: defaults to the ORCiD public API limit.
+        """
         if test_mode:
             origin = "https://sandbox.orcid.org/{id}"
         else:
             origin = "https://orcid.org/{id}"
 
-        super().__init__(origin, *args, **kwargs)
+        super().__init__(
+            origin, *args, requests_per_second=requests_per_second, **kwargs
+        )
 
 
 class OrcidTransformer(BaseTransformer):
@@ -96,24 +103,29 @@ class NamesServiceWriter(ServiceWriter):
             self._identity, id_=id_, id_type=self._scheme_id
         )
 
-    def write(self, stream_entry, *args, **kwargs):
-        """Writes the input entry using a given service."""
-        entry = stream_entry.entry
+    def _write(self, entry, uow=None, retried=False):
+        """Create or update an entry.
+
+        :param retried: if True, a previous attempt failed after possibly
+                        creating the entry, which is then updated.
+        """
         try:
             vocab_id = self._entry_id(entry)
             # it is resolved before creation to avoid duplicates since
             # the pid is recidv2 not e.g. the orcid
             current = self._resolve(vocab_id)
-            if not self._update:
+            if not self._update and not retried:
                 raise WriterError(
                     [f"Vocabulary entry already exists: {entry}"]
                 )
             updated = dict(current.to_dict(), **entry)
-            return StreamEntry(
-                self._service.update(self._identity, current.id, updated)
-            )
+            return StreamEntry(self._service.update(
+                self._identity, current.id, updated, **self._uow_kwargs(uow)
+            ))
         except PIDDoesNotExistError:
-            return StreamEntry(self._service.create(self._identity, entry))
+            return StreamEntry(self._service.create(
+                self._identity, entry, **self._uow_kwargs(uow)
+            ))
 
         except ValidationError as err:
             raise WriterError([{"ValidationError": err.messages}])
@@ -147,6 +159,12 @@ DATASTREAM_CONFIG = {
         {"type": "xml"},
         {"type": "orcid"}
     ],
+    "filters": [{
+        "type": "duplicate",
+        "args": {
+            "id_path": "identifiers.0.identifier",
+        }
+    }],
     "writers": [{
         "type": "names-service",
         "args": {
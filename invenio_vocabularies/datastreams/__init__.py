@@ -8,11 +8,14 @@
 
 """Datastreams module."""
 
-from .datastreams import DataStream, StreamEntry
+from .datastreams import AsyncDataStream, DataStream, PipelinedDataStream, \
+    StreamEntry
 from .factories import DataStreamFactory
 
 __all__ = (
+    "AsyncDataStream",
     "DataStream",
     "DataStreamFactory",
+    "PipelinedDataStream",
     "StreamEntry",
 )
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Checkpoint stores module.
+
+Checkpoints keep the reader position of a data stream run, so an
+interrupted run can be resumed instead of starting from the beginning.
+Positions are reader specific, JSON serializable, values.
+"""
+
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from invenio_db import db
+
+from ..records.models import DataStreamCheckpoint
+
+
+class BaseCheckpointStore(ABC):
+    """Base checkpoint store."""
+
+    @abstractmethod
+    def load(self, key):
+        """Returns the position saved for a key, None if there is none."""
+        pass
+
+    @abstractmethod
+    def save(self, key, position):
+        """Saves the position for a key."""
+        pass
+
+    @abstractmethod
+    def clear(self, key):
+        """Removes the position saved for a key."""
+        pass
+
+
+class FileCheckpointStore(BaseCheckpointStore):
+    """Stores the checkpoints in a local JSON file."""
+
+    def __init__(self, filepath, *args, **kwargs):
+        """Constructor.
+
+        :param filepath: path of the checkpoints file.
+        """
+        self._filepath = Path(filepath)
+
+    def _load_all(self):
+        """Reads all the checkpoints of the file."""
+        if not self._filepath.exists():
+            return {}
+        with open(self._filepath) as f:
+            return json.load(f)
+
+    def _save_all(self, checkpoints):
+        """Replaces the file, so it is never left half written."""
+        dirname = self._filepath.absolute().parent
+        fd, tmp_path = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, "w") as f:
+            json.dump(checkpoints, f)
+        os.replace(tmp_path, self._filepath)
+
+    def load(self, key):
+        """Returns the position saved for a key."""
+        return self._load_all().get(key)
+
+    def save(self, key, position):
+        """Saves the position for a key."""
+        checkpoints = self._load_all()
+        checkpoints[key] = position
+        self._save_all(checkpoints)
+
+    def clear(self, key):
+        """Removes the position saved for a key."""
+        checkpoints = self._load_all()
+        if checkpoints.pop(key, None) is not None:
+            self._save_all(checkpoints)
+
+
+class CacheCheckpointStore(BaseCheckpointStore):
+    """Stores the checkpoints in the Invenio cache.
+
+    It needs `invenio-cache`, e.g. the `cache` extra.
+    """
+
+    def __init__(self, *args, prefix="vocabularies-checkpoint:", **kwargs):
+        """Constructor.
+
+        :param prefix: prefix of the cache keys.
+        """
+        self._prefix = prefix
+
+    @property
+    def _cache(self):
+        """The cache, imported on use as only this store needs it."""
+        from invenio_cache import current_cache
+        return current_cache
+
+    def load(self, key):
+        """Returns the position saved for a key."""
+        return self._cache.get(self._prefix + key)
+
+    def save(self, key, position):
+        """Saves the position for a key, without expiration."""
+        self._cache.set(self._prefix + key, position, timeout=0)
+
+    def clear(self, key):
+        """Removes the position saved for a key."""
+        self._cache.delete(self._prefix + key)
+
+
+class DBCheckpointStore(BaseCheckpointStore):
+    """Stores the checkpoints in a database table."""
+
+    def load(self, key):
+        """Returns the position saved for a key."""
+        checkpoint = DataStreamCheckpoint.query.get(key)
+        return json.loads(checkpoint.position) if checkpoint else None
+
+    def save(self, key, position):
+        """Saves the position for a key."""
+        with db.session.begin_nested():
+            db.session.merge(
+                DataStreamCheckpoint(id=key, position=json.dumps(position))
+            )
+        db.session.commit()
+
+    def clear(self, key):
+        """Removes the position saved for a key."""
+        DataStreamCheckpoint.query.filter_by(id=key).delete()
+        db.session.commit()
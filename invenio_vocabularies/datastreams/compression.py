@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Transparent decompression of the files read by the readers."""
+
+import bz2
+import io
+import lzma
+import os
+import queue
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .tarindex import is_bgzf, read_bgzf_block_header
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+"""Leading bytes of the supported compression formats."""
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+"""Default number of threads decompressing the blocks of BGZF files."""
+
+CHUNK_SIZE = 256 * 1024
+"""Size of the compressed chunks read at once."""
+
+
+def detect_compression(path):
+    """Detect the compression of a file from its first bytes.
+
+    :returns: `gzip`, `bz2`, `xz`, `zstd` or None if not compressed.
+    """
+    with open(path, "rb") as f:
+        header = f.read(6)
+    for magic, compression in MAGIC_BYTES:
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+_DECOMPRESSORS = {
+    # wbits 31 expects a gzip header and trailer
+    "gzip": lambda: zlib.decompressobj(31),
+    "bz2": bz2.BZ2Decompressor,
+    "xz": lzma.LZMADecompressor,
+}
+
+
+def _decompressed_chunks(path, compression):
+    """Decompress a file chunk by chunk.
+
+    Files made of several concatenated streams, e.g. written by `bgzip` or
+    `pbzip2`, are decompressed up to the end.
+    """
+    new_decompressor = _DECOMPRESSORS[compression]
+    with open(path, "rb") as f:
+        decompressor = new_decompressor()
+        data = f.read(CHUNK_SIZE)
+        while data:
+            chunk = decompressor.decompress(data)
+            if chunk:
+                yield chunk
+            if decompressor.eof:
+                data = decompressor.unused_data or f.read(CHUNK_SIZE)
+                if data:
+                    decompressor = new_decompressor()
+            else:
+                data = f.read(CHUNK_SIZE)
+        if not decompressor.eof:
+            raise EOFError(f"{path} is truncated.")
+
+
+def _zstd_chunks(path):
+    """Decompress a zstd file chunk by chunk."""
+    if zstandard is None:
+        raise ValueError(
+            f"{path} is zstd compressed, it needs the zstandard package."
+        )
+    with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(
+        f, read_across_frames=True
+    ) as reader:
+        while True:
+            chunk = reader.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _bgzf_chunks(path, workers):
+    """Decompress the blocks of a BGZF file in parallel, in order."""
+    with open(path, "rb") as f, ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        while True:
+            header = read_bgzf_block_header(f)
+            if header is None:
+                break
+            bsize, hsize = header
+            # without the CRC and size trailer
+            data = f.read(bsize - hsize)[:-8]
+            pending.append(executor.submit(zlib.decompress, data, -15))
+            # bounds the memory used by the decompressed blocks
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _BackgroundReader(io.RawIOBase):
+    """Reads the chunks of a generator run in a background thread.
+
+    The decompression functions release the GIL, so the file is
+    decompressed while the chunks before are parsed.
+    """
+
+    def __init__(self, chunks, queue_size=64):
+        """Constructor.
+
+        :param chunks: function returning the generator of the chunks.
+        :param queue_size: maximum number of chunks read in advance.
+        """
+        super().__init__()
+        self._queue = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._buffer = memoryview(b"")
+        self._eof = False
+        # the thread does not reference the reader, so it can be garbage
+        # collected, and closed, if not closed explicitly
+        self._thread = threading.Thread(
+            target=self._produce, args=(chunks, self._queue, self._stop),
+            daemon=True,
+        )
+        self._thread.start()
+
+    @staticmethod
+    def _produce(chunks, chunks_queue, stop):
+        """Queue the chunks, then None or the error that stopped them."""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        generator = chunks()
+        try:
+            for chunk in generator:
+                if not put(chunk):
+                    return
+        except Exception as err:
+            put(err)
+            return
+        finally:
+            generator.close()
+        put(None)
+
+    def readable(self):
+        """The reader is readable."""
+        return True
+
+    def readinto(self, b):
+        """Read the next decompressed bytes into a buffer."""
+        while not self._buffer:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None or isinstance(item, Exception):
+                self._eof = True
+                if item is None:
+                    return 0
+                raise item
+            self._buffer = memoryview(item)
+
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        """Stop the background thread."""
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
+
+
+def open_file(path, mode="rb", encoding=None, newline=None, workers=None):
+    """Open a file, decompressing it if it is compressed.
+
+    The compression is detected from the first bytes of the file, so
+    compressed files do not need a specific extension. They are
+    decompressed in a background thread, and BGZF files, e.g. written with
+    `bgzip`, with several threads decompressing blocks in parallel.
+
+    :param mode: `rb`, or `rt` to decode the content.
+    :param encoding: encoding of the content, in text mode.
+    :param newline: newline handling, in text mode, as in `open`.
+    :param workers: number of threads decompressing the blocks of BGZF
+                    files, defaults to `DEFAULT_WORKERS`. 1 does not
+                    decompress blocks in parallel.
+    """
+    if mode not in ("r", "rb", "rt"):
+        raise ValueError(f"Unsupported mode {mode}.")
+    path = str(path)
+    compression = detect_compression(path)
+    if compression is None:
+        if mode == "rb":
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, newline=newline)
+
+    workers = workers or DEFAULT_WORKERS
+    if compression == "zstd":
+        chunks = partial(_zstd_chunks, path)
+    elif compression == "gzip" and workers > 1 and is_bgzf(path):
+        chunks = partial(_bgzf_chunks, path, workers)
+    else:
+        chunks = partial(_decompressed_chunks, path, compression)
+    f = io.BufferedReader(_BackgroundReader(chunks), CHUNK_SIZE)
+    if mode == "rb":
+        return f
+    return io.TextIOWrapper(f, encoding=encoding, newline=newline)
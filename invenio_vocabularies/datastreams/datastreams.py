@@ -8,36 +8,233 @@
 
 """Base data stream."""
 
+import asyncio
+import copy
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from itertools import islice
+from time import perf_counter
+
+from flask import current_app, has_app_context
+
 from .errors import TransformerError, WriterError
+from .instrumentation import Instrumentation
 
 
 class StreamEntry:
     """Object to encapsulate streams processing."""
 
-    def __init__(self, entry, errors=None):
-        """Constructor."""
+    def __init__(self, entry, errors=None, position=None):
+        """Constructor.
+
+        :param position: reader position right after this entry, used to
+                         resume reading from the next one.
+        """
         self.entry = entry
         self.filtered = False
         self.errors = errors or []
+        self.position = position
+
+
+def bind_app_context(func):
+    """Bind a function to the current application context.
+
+    The returned function pushes the context when called, so it can run in
+    other threads. If there is no application context, `func` is returned.
+    """
+    if not has_app_context():
+        return func
+    app = current_app._get_current_object()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _apply_transformers(
+    transformers, stream_entry, catch=TransformerError, on_transform=None
+):
+    """Apply a chain of transformers to an stream_entry.
+
+    The chain stops at the first transformer raising one of the `catch`
+    exceptions, which is added to the entry errors. Entries that the reader
+    failed to read, i.e. with errors, are not transformed.
+
+    :param on_transform: called with the index of each applied transformer
+                         and the time it took.
+    """
+    if stream_entry.errors:
+        return stream_entry
+
+    for idx, transformer in enumerate(transformers):
+        start = perf_counter()
+        try:
+            stream_entry = transformer.apply(stream_entry)
+        except catch as err:
+            stream_entry.errors.append(
+                f"{transformer.__class__.__name__}: {str(err)}"
+            )
+            return stream_entry  # break loop
+        finally:
+            if on_transform:
+                on_transform(idx, perf_counter() - start)
+
+    return stream_entry
+
+
+_worker_transformers = None
+"""Transformers chain of a transform pool worker process."""
+
+
+def _error_messages(component, err):
+    """The messages of an error raised by a stream component.
+
+    Errors raised with a list of messages, e.g. the validation errors of a
+    writer, give a message each, so they are counted apart.
+    """
+    messages = err.args[0] if len(err.args) == 1 \
+        and isinstance(err.args[0], list) else [err]
+    return [
+        f"{component.__class__.__name__}: {message}" for message in messages
+    ]
+
+
+def _init_transform_worker(transformers):
+    """Initialise a transform pool worker."""
+    global _worker_transformers
+    _worker_transformers = transformers
+
+
+def _transform_chunk(stream_entries):
+    """Transform a chunk of entries in a transform pool worker.
+
+    Any exception is captured in the failing entry, otherwise it would
+    abort the whole chunk.
+
+    :returns: the transformed entries, and the index and elapsed time of
+              each applied transformer.
+    """
+    timings = []
+
+    def on_transform(idx, elapsed):
+        timings.append((idx, elapsed))
+
+    transformed = [
+        _apply_transformers(
+            _worker_transformers, stream_entry, Exception, on_transform
+        )
+        for stream_entry in stream_entries
+    ]
+    return transformed, timings
 
 
 class DataStream:
     """Data stream."""
 
-    def __init__(self, reader, writers, transformers=None, *args, **kwargs):
+    def __init__(
+        self, reader, writers, transformers=None, *args, batch_size=None,
+        transform_workers=None, transform_chunk_size=64,
+        transform_ordered=True, checkpoint_store=None, checkpoint_key=None,
+        checkpoint_interval=1000, instrumentation=None, dead_letter=None,
+        filters=None, partition=None, concurrent_writers=False,
+        write_retry=None, read_rate_limit=None, write_rate_limits=None,
+        dry_run=False, **kwargs
+    ):
         """Constructor.
 
         :param reader: the reader object.
         :param writers: an ordered list of writers.
         :param transformers: an ordered list of transformers to apply.
+        :param batch_size: if set, transformed entries are grouped in batches
+                           of this size and written with `write_many`.
+        :param transform_workers: if set, the transformers are applied in a
+                                  pool of this many processes. Transformers
+                                  and entries must be picklable.
+        :param transform_chunk_size: number of entries sent at once to a
+                                     transform worker.
+        :param transform_ordered: if False, entries are yielded as soon as
+                                  they are transformed instead of in the
+                                  order they were read.
+        :param checkpoint_store: if set, the reader position is saved in it
+                                 and reading resumes from the saved one.
+        :param checkpoint_key: key of the checkpoint, defaults to the reader
+                               class and origin.
+        :param checkpoint_interval: number of entries between checkpoints.
+        :param instrumentation: an `Instrumentation` called with the time
+                                spent in each stage.
+        :param dead_letter: a `DeadLetterWriter` where the raw content of the
+                            entries that failed is written.
+        :param filters: a list of filters, an entry is skipped if any of them
+                        filters it out.
+        :param partition: a `(start, stop)` range of reader positions, as
+                          given by the reader `partitions`, to only process
+                          the entries positioned after `start` and up to
+                          `stop`. A None `stop` reads until the end.
+        :param concurrent_writers: if True, the writers write each entry at
+                                   the same time, each in its own thread.
+        :param write_retry: a `RetryPolicy` for the writes failing with a
+                            transient error. If all the attempts fail, the
+                            error is added to the entries.
+        :param read_rate_limit: a `RateLimiter` throttling the reads.
+        :param write_rate_limits: a list with a `RateLimiter`, or None, per
+                                  writer throttling its writes.
+        :param dry_run: if True, the entries are validated by the writers
+                        instead of written, one by one. Checkpoints are
+                        neither loaded nor saved.
         """
+        if checkpoint_store and not transform_ordered:
+            raise ValueError("Checkpoints require ordered transformations.")
+
         self._reader = reader  # a single entry point
         self._transformers = transformers
         self._writers = writers
+        self._batch_size = batch_size
+        self._transform_workers = transform_workers
+        self._transform_chunk_size = transform_chunk_size
+        self._transform_ordered = transform_ordered
+        self._checkpoint_store = checkpoint_store
+        self._checkpoint_key = checkpoint_key or (
+            f"{reader.__class__.__name__}:{getattr(reader, '_origin', '')}"
+        )
+        self._start, self._stop = partition or (None, None)
+        if partition:
+            self._checkpoint_key += f":{self._start}-{self._stop}"
+        self._checkpoint_interval = checkpoint_interval
+        self._instrumentation = instrumentation or Instrumentation()
+        self._dead_letter = dead_letter
+        self._filters = filters or []
+        self._concurrent_writers = concurrent_writers
+        self._write_retry = write_retry
+        self._read_rate_limit = read_rate_limit
+        self._write_rate_limits = write_rate_limits or [None] * len(writers)
+        self._dry_run = dry_run
+        if dry_run:
+            # nothing is persisted, writers only validate the entries
+            self._checkpoint_store = None
+            self._write_rate_limits = [None] * len(writers)
+        self._executors = None
 
     def filter(self, stream_entry, *args, **kwargs):
         """Checks if an stream_entry should be filtered out (skipped)."""
-        return False
+        return any(f.filter(stream_entry) for f in self._filters)
+
+    def _close(self):
+        """Release the resources held by the stream components."""
+        for filter_ in self._filters:
+            filter_.close()
+        if self._dead_letter:
+            self._dead_letter.close()
+        if self._executors:
+            for executor in self._executors:
+                executor.shutdown()
+            self._executors = None
 
     def process(self, *args, **kwargs):
         """Iterates over the entries.
@@ -46,42 +243,518 @@ class DataStream:
         It will iterate over the `StreamEntry` objects returned by
         the reader, apply the transformations and yield the result of
         writing it.
+
+        In batch mode, entries that errored or were filtered are yielded
+        straight away, while the rest are yielded once their batch has been
+        written.
+
+        With a checkpoint store, the position of the last processed entry is
+        saved every `checkpoint_interval` entries, and cleared once all the
+        entries have been processed.
         """
-        for stream_entry in self._reader.read():
-            transformed_entry = self.transform(stream_entry)
-            if transformed_entry.errors:
-                yield transformed_entry
-            elif self.filter(transformed_entry):
-                transformed_entry.filtered = True
-                yield transformed_entry
+        yield from self._write_all(self._transform_all(self._read()))
+
+    def _start_position(self):
+        """The position to start reading from, if any.
+
+        That is the one saved in the checkpoint store, or the start of the
+        partition.
+        """
+        position = None
+        if self._checkpoint_store:
+            position = self._checkpoint_store.load(self._checkpoint_key)
+        return self._start if position is None else position
+
+    def _read(self):
+        """Read the entries, from the checkpoint position if any."""
+        position = self._start_position()
+        if position is None:
+            entries = iter(self._reader.read())
+        else:
+            entries = iter(self._reader.read(position=position))
+
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    stream_entry = next(entries)
+                except StopIteration:
+                    return
+                self._instrumentation.on_read(
+                    self._reader, perf_counter() - start
+                )
+                if self._stop is not None:
+                    if stream_entry.position is None:
+                        raise ValueError(
+                            "The entries have no position, they cannot be "
+                            "read up to the end of a partition."
+                        )
+                    if stream_entry.position > self._stop:
+                        return
+                if self._read_rate_limit:
+                    self._read_rate_limit.acquire_for([stream_entry])
+                if self._dead_letter:
+                    # transformers can modify mutable entries in place
+                    stream_entry.raw = copy.deepcopy(stream_entry.entry) \
+                        if isinstance(stream_entry.entry, (dict, list)) \
+                        else stream_entry.entry
+                yield stream_entry
+        finally:
+            if hasattr(entries, "close"):
+                entries.close()
+
+    def _checkpoint(self, position):
+        """Save a checkpoint every `checkpoint_interval` entries."""
+        if self._uncheckpointed >= self._checkpoint_interval \
+                and position is not None:
+            self._checkpoint_store.save(self._checkpoint_key, position)
+            self._uncheckpointed = 0
+
+    def _write_all(self, transformed_entries):
+        """Filter and write the transformed entries.
+
+        Checkpoints are only saved when no entry is waiting in a batch, so
+        every entry before the saved position has been processed.
+        """
+        self._uncheckpointed = 0
+        batch = []
+        try:
+            for transformed_entry in transformed_entries:
+                if transformed_entry.errors:
+                    yield from self._failed([transformed_entry], "transform")
+                elif self.filter(transformed_entry):
+                    transformed_entry.filtered = True
+                    yield transformed_entry
+                elif self._batch_size:
+                    batch.append(transformed_entry)
+                    if len(batch) >= self._batch_size:
+                        yield from self._failed(self.write_many(batch))
+                        batch = []
+                else:
+                    yield from self._failed([self.write(transformed_entry)])
+
+                # the entries of a flushed batch are all counted, and the
+                # last one, just flushed, gives the checkpoint position
+                self._uncheckpointed += 1
+                if self._checkpoint_store and not batch:
+                    self._checkpoint(transformed_entry.position)
+
+            if batch:
+                yield from self._failed(self.write_many(batch))
+
+            if self._checkpoint_store:
+                self._checkpoint_store.clear(self._checkpoint_key)
+        finally:
+            self._close()
+
+    def _failed(self, stream_entries, stage="write"):
+        """Send the entries with errors to the dead letter, if any."""
+        if self._dead_letter:
+            for stream_entry in stream_entries:
+                if stream_entry.errors:
+                    self._dead_letter.write(stream_entry, stage=stage)
+        return stream_entries
+
+    def _transform_all(self, stream_entries):
+        """Transform the read entries, in a process pool if configured."""
+        if not self._transform_workers or not self._transformers:
+            for stream_entry in stream_entries:
+                yield self.transform(stream_entry)
+            return
+
+        with multiprocessing.Pool(
+            self._transform_workers,
+            initializer=_init_transform_worker,
+            initargs=(self._transformers, ),
+        ) as pool:
+            yield from self._transform_in_pool(pool, stream_entries)
+
+    def _transform_in_pool(self, pool, stream_entries):
+        """Send chunks of entries to a pool and yield the results.
+
+        The number of chunks in flight is bounded, so the reader is not
+        consumed faster than the entries are processed.
+        """
+        max_pending = 2 * self._transform_workers
+        results = deque() if self._transform_ordered else queue.Queue()
+        stream_entries = iter(stream_entries)
+        chunk_size = self._transform_chunk_size
+
+        def chunks():
+            while True:
+                chunk = list(islice(stream_entries, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+
+        def next_result():
+            if self._transform_ordered:
+                result = results.popleft().get()
+            else:
+                result = results.get()
+                if isinstance(result, Exception):
+                    raise result
+            transformed, timings = result
+            for idx, elapsed in timings:
+                self._instrumentation.on_transform(
+                    self._transformers[idx], elapsed
+                )
+            return transformed
+
+        pending = 0
+        for chunk in chunks():
+            if self._transform_ordered:
+                results.append(pool.apply_async(_transform_chunk, (chunk, )))
             else:
-                yield self.write(transformed_entry)
+                pool.apply_async(
+                    _transform_chunk,
+                    (chunk, ),
+                    callback=results.put,
+                    error_callback=results.put,
+                )
+            pending += 1
+            if pending >= max_pending:
+                yield from next_result()
+                pending -= 1
+
+        while pending:
+            yield from next_result()
+            pending -= 1
+
+    def _on_transform(self, idx, elapsed):
+        """Report the time spent by a transformer."""
+        self._instrumentation.on_transform(self._transformers[idx], elapsed)
 
     def transform(self, stream_entry, *args, **kwargs):
         """Apply the transformations to an stream_entry."""
-        for transformer in self._transformers:
-            try:
-                stream_entry = transformer.apply(stream_entry)
-            except TransformerError as err:
-                stream_entry.errors.append(
-                    f"{transformer.__class__.__name__}: {str(err)}"
-                )
-                return stream_entry  # break loop
+        return _apply_transformers(
+            self._transformers, stream_entry, on_transform=self._on_transform
+        )
+
+    def write(self, stream_entry, *args, **kwargs):
+        """Write an stream_entry with each of the writers.
 
+        In dry run mode, the writers only validate it.
+        """
+        if self._dry_run:
+            self._write_with_all(
+                lambda writer: writer.validate(stream_entry), [stream_entry],
+                retry=self._write_retry,
+            )
+        else:
+            self._write_with_all(
+                lambda writer: writer.write(stream_entry), [stream_entry],
+                retry=self._write_retry,
+            )
         return stream_entry
 
-    def write(self, stream_entry, *args, **kwargs):
-        """Apply the transformations to an stream_entry."""
-        for writer in self._writers:
+    def write_many(self, stream_entries, *args, **kwargs):
+        """Write a batch of stream entries with each of the writers.
+
+        Errors raised for the whole batch are added to all of its entries.
+        Writes are retried by the writers entry by entry, a batch is not
+        written again as a whole. In dry run mode, the entries are validated
+        one by one so each gets its own errors.
+        """
+        if self._dry_run:
+            return [self.write(entry) for entry in stream_entries]
+
+        return self._write_with_all(
+            lambda writer: writer.write_many(
+                stream_entries, retry=self._write_retry
+            ),
+            stream_entries,
+        )
+
+    def _write_with_all(self, write, stream_entries, retry=None):
+        """Call `write` with each writer, concurrently if configured.
+
+        The writer errors are added to the written entries in the order of
+        the writers, and the time spent by each is reported.
+
+        :param retry: a `RetryPolicy` to call `write` with.
+        """
+        def run(writer, rate_limit):
+            if rate_limit:
+                # waiting is not accounted as writing time
+                rate_limit.acquire_for(stream_entries)
+            start = perf_counter()
             try:
-                writer.write(stream_entry)
+                if retry:
+                    retry.call(write, writer)
+                else:
+                    write(writer)
             except WriterError as err:
-                stream_entry.errors.append(
-                    f"{writer.__class__.__name__}: {str(err)}"
+                return err, perf_counter() - start
+            except Exception as err:
+                if not self._write_retry \
+                        or not self._write_retry.is_retryable(err):
+                    raise
+                return err, perf_counter() - start
+            return None, perf_counter() - start
+
+        executors = self._writer_executors()
+        if executors:
+            run = bind_app_context(run)
+            results = [
+                future.result() for future in [
+                    executor.submit(run, writer, rate_limit)
+                    for executor, writer, rate_limit in zip(
+                        executors, self._writers, self._write_rate_limits
+                    )
+                ]
+            ]
+        else:
+            results = [
+                run(writer, rate_limit) for writer, rate_limit in zip(
+                    self._writers, self._write_rate_limits
                 )
+            ]
 
-        return stream_entry
+        for writer, (err, elapsed) in zip(self._writers, results):
+            if err:
+                for stream_entry in stream_entries:
+                    stream_entry.errors.extend(_error_messages(writer, err))
+            self._instrumentation.on_write(
+                writer, elapsed, len(stream_entries)
+            )
+
+        return stream_entries
+
+    def _writer_executors(self):
+        """One single thread executor per writer, if writing concurrently.
+
+        A single thread keeps the writes of each writer in order.
+        """
+        if self._concurrent_writers and len(self._writers) > 1 \
+                and not self._executors:
+            self._executors = [
+                ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix=f"datastream-writer-{idx}",
+                )
+                for idx in range(len(self._writers))
+            ]
+        return self._executors
+
+    def total_is_cheap(self):
+        """Checks if the total can be counted without reading the origin."""
+        return self._reader.count_is_cheap()
 
     def total(self, *args, **kwargs):
-        """The total of entries obtained from the origin."""
-        raise NotImplementedError()
+        """The total of entries obtained from the origin.
+
+        Entries before the checkpoint, if any, and outside the partition
+        are not counted. Raises NotImplementedError if the reader cannot
+        count its entries.
+        """
+        position = self._start_position()
+        if position is None:
+            total = self._reader.count()
+        else:
+            total = self._reader.count(position=position)
+        if self._stop is not None:
+            total -= self._reader.count(position=self._stop)
+        return total
+
+
+class _StageError:
+    """Wraps an exception raised in a pipeline stage."""
+
+    def __init__(self, error):
+        """Constructor."""
+        self.error = error
+
+
+_END_OF_STAGE = object()
+"""Marks that a pipeline stage has no more entries."""
+
+
+class PipelinedDataStream(DataStream):
+    """Data stream with overlapping read, transform and write stages.
+
+    The reader and the transformers run each in their own thread, while the
+    entries are written in the thread consuming `process`. Stages are linked
+    by bounded queues, so a slow stage blocks the ones feeding it.
+
+    An exception in any stage stops the pipeline and is raised by `process`.
+    Closing the `process` generator stops the other stages.
+    """
+
+    POLL_INTERVAL = 0.1
+    """Seconds between checks of the stop signal while waiting on a queue."""
+
+    def __init__(self, *args, queue_size=1000, **kwargs):
+        """Constructor.
+
+        :param queue_size: maximum number of entries waiting between stages.
+        """
+        self._queue_size = queue_size
+        super().__init__(*args, **kwargs)
+
+    def process(self, *args, **kwargs):
+        """Iterates over the entries running the stages concurrently."""
+        stop = threading.Event()
+        read_queue = queue.Queue(self._queue_size)
+        transform_queue = queue.Queue(self._queue_size)
+
+        threads = [
+            self._start_stage(self._read, read_queue, stop, name="reader"),
+            self._start_stage(
+                lambda: self._transform_all(self._consume(read_queue, stop)),
+                transform_queue,
+                stop,
+                name="transformer",
+            ),
+        ]
+        try:
+            yield from self._write_all(self._consume(transform_queue, stop))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _start_stage(self, produce, output, stop, name):
+        """Start a thread putting in `output` what `produce` yields."""
+        @bind_app_context
+        def run():
+            entries = iter(produce())
+            try:
+                for entry in entries:
+                    if not self._put(output, entry, stop):
+                        return
+            except Exception as err:
+                self._put(output, _StageError(err), stop)
+            else:
+                self._put(output, _END_OF_STAGE, stop)
+            finally:
+                if hasattr(entries, "close"):
+                    entries.close()
+
+        thread = threading.Thread(
+            target=run, name=f"datastream-{name}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _put(self, output, item, stop):
+        """Put an item in a queue, unless the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _consume(self, input_, stop):
+        """Yield the items of a queue until its stage ends."""
+        while not stop.is_set():
+            try:
+                item = input_.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _END_OF_STAGE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+
+
+class AsyncDataStream(DataStream):
+    """Data stream driven by an asyncio event loop.
+
+    Several entries are transformed and written concurrently, up to the
+    `concurrency` limit. Synchronous readers and writers are adapted to run
+    in the event loop executor. Results are yielded in the read order.
+
+    Entries are written one by one, batches, checkpoints, dead letters,
+    partitions, transform workers, concurrent writers and write retries
+    are not supported.
+    """
+
+    UNSUPPORTED = (
+        "batch_size", "transform_workers", "checkpoint_store", "dead_letter",
+        "partition", "concurrent_writers", "write_retry",
+    )
+    """Data stream arguments an asynchronous data stream does not support."""
+
+    def __init__(self, *args, concurrency=100, **kwargs):
+        """Constructor.
+
+        :param concurrency: maximum number of entries processed at once.
+        """
+        unsupported = [name for name in self.UNSUPPORTED if kwargs.get(name)]
+        if unsupported:
+            raise ValueError(
+                "Asynchronous data streams do not support "
+                f"{', '.join(unsupported)}."
+            )
+        self._concurrency = concurrency
+        super().__init__(*args, **kwargs)
+
+    async def process(self, *args, **kwargs):
+        """Iterates asynchronously over the entries."""
+        # avoid circular imports, readers and writers depend on this module
+        from .readers import AsyncBaseReader, AsyncReaderAdapter
+        from .writers import AsyncBaseWriter, AsyncWriterAdapter
+
+        reader = self._reader
+        if not isinstance(reader, AsyncBaseReader):
+            reader = AsyncReaderAdapter(reader)
+        writers = [
+            w if isinstance(w, AsyncBaseWriter) else AsyncWriterAdapter(w)
+            for w in self._writers
+        ]
+
+        pending = deque()
+        try:
+            async for stream_entry in reader.read():
+                if self._read_rate_limit:
+                    await asyncio.sleep(self._read_rate_limit.reserve(
+                        self._read_rate_limit.cost([stream_entry])
+                    ))
+                pending.append(asyncio.ensure_future(
+                    self._process_entry(stream_entry, writers)
+                ))
+                if len(pending) >= self._concurrency:
+                    yield await pending.popleft()
+
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            self._close()
+
+    async def _process_entry(self, stream_entry, writers):
+        """Transform, filter and write an entry."""
+        transformed_entry = self.transform(stream_entry)
+        if transformed_entry.errors:
+            return transformed_entry
+        if self.filter(transformed_entry):
+            transformed_entry.filtered = True
+            return transformed_entry
+        if self._dry_run:
+            # validating might query the database, it must not block the loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, bind_app_context(partial(self.write, transformed_entry))
+            )
+
+        for writer, async_writer, rate_limit in zip(
+            self._writers, writers, self._write_rate_limits
+        ):
+            if rate_limit:
+                await asyncio.sleep(rate_limit.reserve(
+                    rate_limit.cost([transformed_entry])
+                ))
+            start = perf_counter()
+            try:
+                await async_writer.write(transformed_entry)
+            except WriterError as err:
+                transformed_entry.errors.extend(_error_messages(writer, err))
+            finally:
+                self._instrumentation.on_write(writer, perf_counter() - start)
+
+        return transformed_entry
@@ -21,9 +21,25 @@ class WriterError(Exception):
     """Transformer application exception."""
 
 
+class RetryableError(Exception):
+    """Transient failure exception, the operation can be retried."""
+
+
 class FactoryError(Exception):
     """Transformer application exception."""
 
     def __init__(self, name, key):
         """Initialise error."""
         super().__init__(f"{name} {key} not configured.")
+
+
+class DataStreamConfigError(FactoryError):
+    """Invalid data stream configuration exception."""
+
+    def __init__(self, errors):
+        """Initialise error.
+
+        :param errors: list of error messages.
+        """
+        self.errors = errors
+        Exception.__init__(self, "; ".join(errors))
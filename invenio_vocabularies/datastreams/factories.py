@@ -8,21 +8,41 @@
 
 """Data stream factory."""
 
+import inspect
+from functools import lru_cache
+
 from flask import current_app
+from pkg_resources import EntryPoint, iter_entry_points
+from werkzeug.utils import import_string
+
+from .datastreams import AsyncDataStream, DataStream, PipelinedDataStream
+from .errors import DataStreamConfigError, FactoryError
+
 
-from .datastreams import DataStream
-from .errors import FactoryError
+@lru_cache(maxsize=None)
+def _entry_points(group):
+    """The entry points of a group, by name. They are not loaded."""
+    return {ep.name: ep for ep in iter_entry_points(group)}
 
 
 class OptionsConfigMixin:
-    """Options from config mixin."""
+    """Options from entry points and config mixin."""
 
     CONFIG_VAR = None
+    ENTRY_POINT_GROUP = None
 
     @classmethod
     def options(cls):
-        """Reads the possible options form config."""
-        return current_app.config.get(cls.CONFIG_VAR, {})
+        """Reads the possible options from entry points and config.
+
+        Options in the config take precedence over the entry points. Their
+        values can be classes or import strings, e.g. `module:Class`.
+        """
+        options = {}
+        if cls.ENTRY_POINT_GROUP:
+            options.update(_entry_points(cls.ENTRY_POINT_GROUP))
+        options.update(current_app.config.get(cls.CONFIG_VAR, {}))
+        return options
 
 
 class Factory:
@@ -31,22 +51,51 @@ class Factory:
     FACTORY_NAME = None
 
     @classmethod
-    def create(cls, config):
-        """Creats a factory from config."""
+    def load(cls, type_):
+        """Get the class of a type, importing it if needed."""
         try:
-            type_ = config["type"]
-            args = config.get("args", {})
-
-            return cls.options()[type_](**args)
+            option = cls.options()[type_]
         except KeyError:
             raise FactoryError(name=cls.FACTORY_NAME, key=type_)
 
+        if isinstance(option, EntryPoint):
+            return option.load()
+        elif isinstance(option, str):
+            return import_string(option)
+        return option
+
+    @classmethod
+    def validate(cls, config):
+        """Validates a config without instantiating it.
+
+        :returns: a list of errors, empty if the config is valid.
+        """
+        type_ = config.get("type")
+        try:
+            class_ = cls.load(type_)
+        except FactoryError as err:
+            return [str(err)]
+        except ImportError as err:
+            return [f"{cls.FACTORY_NAME} {type_} cannot be imported: {err}"]
+
+        try:
+            inspect.signature(class_).bind(**config.get("args", {}))
+        except TypeError as err:
+            return [f"{cls.FACTORY_NAME} {type_} invalid arguments: {err}"]
+        return []
+
+    @classmethod
+    def create(cls, config):
+        """Creats a factory from config."""
+        return cls.load(config.get("type"))(**config.get("args", {}))
+
 
 class WriterFactory(Factory, OptionsConfigMixin):
     """Writer factory."""
 
     FACTORY_NAME = "Writer"
     CONFIG_VAR = "VOCABULARIES_DATASTREAM_WRITERS"
+    ENTRY_POINT_GROUP = "invenio_vocabularies.datastream.writers"
 
 
 class ReaderFactory(Factory, OptionsConfigMixin):
@@ -54,6 +103,7 @@ class ReaderFactory(Factory, OptionsConfigMixin):
 
     FACTORY_NAME = "Reader"
     CONFIG_VAR = "VOCABULARIES_DATASTREAM_READERS"
+    ENTRY_POINT_GROUP = "invenio_vocabularies.datastream.readers"
 
 
 class TransformerFactory(Factory, OptionsConfigMixin):
@@ -61,26 +111,158 @@ class TransformerFactory(Factory, OptionsConfigMixin):
 
     FACTORY_NAME = "Transformer"
     CONFIG_VAR = "VOCABULARIES_DATASTREAM_TRANSFORMERS"
+    ENTRY_POINT_GROUP = "invenio_vocabularies.datastream.transformers"
+
+
+class CheckpointStoreFactory(Factory, OptionsConfigMixin):
+    """Checkpoint store factory."""
+
+    FACTORY_NAME = "Checkpoint store"
+    CONFIG_VAR = "VOCABULARIES_DATASTREAM_CHECKPOINT_STORES"
+    ENTRY_POINT_GROUP = "invenio_vocabularies.datastream.checkpoint_stores"
+
+
+class FilterFactory(Factory, OptionsConfigMixin):
+    """Filter factory."""
+
+    FACTORY_NAME = "Filter"
+    CONFIG_VAR = "VOCABULARIES_DATASTREAM_FILTERS"
+    ENTRY_POINT_GROUP = "invenio_vocabularies.datastream.filters"
+
+
+def _rate_limit(config):
+    """Create the rate limiter of a reader or writer config, if any."""
+    if not config.get("rate_limit"):
+        return None
+    # imported on use, like the components
+    from .ratelimit import RateLimiter
+    return RateLimiter(**config["rate_limit"])
+
+
+def _validate_rate_limit(config):
+    """Validates the rate limit of a reader or writer config, if any.
+
+    :returns: a list of errors, empty if the config is valid.
+    """
+    if not config.get("rate_limit"):
+        return []
+    from .ratelimit import RateLimiter
+    rate_limit = config["rate_limit"]
+    try:
+        inspect.signature(RateLimiter).bind(**rate_limit)
+    except TypeError as err:
+        return [f"Rate limit of {config.get('type')} invalid: {err}"]
+    if rate_limit.get("unit", "entries") not in RateLimiter.UNITS:
+        return [
+            f"Rate limit of {config.get('type')} invalid: unit must be one "
+            f"of {', '.join(RateLimiter.UNITS)}."
+        ]
+    return []
 
 
 class DataStreamFactory:
     """Data streams factory."""
 
+    @classmethod
+    def validate(
+        cls, reader_config, writers_config, transformers_config=None,
+        checkpoint_config=None, dead_letter_config=None, filters_config=None,
+        **kwargs
+    ):
+        """Validates the config of all the components of a data stream.
+
+        No component is instantiated, but their classes are imported.
+
+        :raises DataStreamConfigError: with the errors of all components.
+        """
+        errors = ReaderFactory.validate(reader_config)
+        errors.extend(_validate_rate_limit(reader_config))
+        for w_conf in writers_config:
+            errors.extend(WriterFactory.validate(w_conf))
+            errors.extend(_validate_rate_limit(w_conf))
+        for t_conf in transformers_config or []:
+            errors.extend(TransformerFactory.validate(t_conf))
+        for f_conf in filters_config or []:
+            errors.extend(FilterFactory.validate(f_conf))
+        if dead_letter_config:
+            errors.extend(WriterFactory.validate(dead_letter_config))
+        if checkpoint_config:
+            errors.extend(CheckpointStoreFactory.validate(checkpoint_config))
+
+        if errors:
+            raise DataStreamConfigError(errors)
+
     @classmethod
     def create(
-        cls, reader_config, writers_config, transformers_config=None, **kwargs
+        cls, reader_config, writers_config, transformers_config=None,
+        pipelined=False, checkpoint_config=None, dead_letter_config=None,
+        filters_config=None, write_retry_config=None, asynchronous=False,
+        **kwargs
     ):
-        """Creates a data stream based on the config."""
+        """Creates a data stream based on the config.
+
+        The reader and writers configs can have a `rate_limit` with the
+        arguments of a `RateLimiter` throttling them.
+
+        :param pipelined: if True, the stream stages run concurrently.
+        :param checkpoint_config: config of the store to save checkpoints.
+        :param dead_letter_config: config of the writer for failed entries.
+        :param filters_config: an ordered list of filter configs.
+        :param write_retry_config: arguments of the `RetryPolicy` of writes.
+        :param asynchronous: if True, the entries are processed concurrently
+                             by an `AsyncDataStream`, whose `process` is an
+                             asynchronous generator.
+        """
+        if pipelined and asynchronous:
+            raise ValueError(
+                "A data stream cannot be both pipelined and asynchronous."
+            )
+        cls.validate(
+            reader_config, writers_config, transformers_config,
+            checkpoint_config=checkpoint_config,
+            dead_letter_config=dead_letter_config,
+            filters_config=filters_config,
+        )
+
         reader = ReaderFactory.create(reader_config)
         writers = []
         for w_conf in writers_config:
             writers.append(WriterFactory.create(w_conf))
 
+        kwargs["read_rate_limit"] = _rate_limit(reader_config)
+        kwargs["write_rate_limits"] = [
+            _rate_limit(w_conf) for w_conf in writers_config
+        ]
+
         transformers = []
         if transformers_config:
             for t_conf in transformers_config:
                 transformers.append(TransformerFactory.create(t_conf))
 
-        return DataStream(
-            reader=reader, writers=writers, transformers=transformers
+        if filters_config:
+            kwargs["filters"] = [
+                FilterFactory.create(f_conf) for f_conf in filters_config
+            ]
+
+        if write_retry_config:
+            # imported on use, like the components, it depends on requests
+            from .retry import RetryPolicy
+            kwargs["write_retry"] = RetryPolicy(**write_retry_config)
+
+        if dead_letter_config:
+            kwargs["dead_letter"] = WriterFactory.create(dead_letter_config)
+
+        if checkpoint_config:
+            kwargs["checkpoint_store"] = CheckpointStoreFactory.create(
+                checkpoint_config
+            )
+
+        datastream_cls = DataStream
+        if pipelined:
+            datastream_cls = PipelinedDataStream
+        elif asynchronous:
+            datastream_cls = AsyncDataStream
+        return datastream_cls(
+            reader=reader, writers=writers, transformers=transformers,
+            **kwargs
         )
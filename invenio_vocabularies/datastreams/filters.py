@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Filters module."""
+
+import sqlite3
+from abc import ABC, abstractmethod
+
+from invenio_records.dictutils import dict_lookup
+
+
+class BaseFilter(ABC):
+    """Base filter."""
+
+    @abstractmethod
+    def filter(self, stream_entry, *args, **kwargs):
+        """Checks if an stream entry should be filtered out (skipped)."""
+        pass
+
+    def close(self):
+        """Release the resources held by the filter."""
+        pass
+
+
+class DuplicateFilter(BaseFilter):
+    """Filters out the entries with an already seen id.
+
+    The seen ids are kept in an in-memory set until there are more than
+    `max_in_memory` of them. Then they are moved to a temporary on-disk
+    SQLite database, so the memory usage stays bounded for large origins.
+    Entries without id are never filtered out.
+    """
+
+    def __init__(self, id_path="id", *args, max_in_memory=1000000, **kwargs):
+        """Constructor.
+
+        :param id_path: dotted path of the id in the transformed entries,
+                        e.g. `identifiers.0.identifier`.
+        :param max_in_memory: maximum number of ids kept in memory.
+        """
+        self._id_path = id_path
+        self._max_in_memory = max_in_memory
+        self._seen = set()
+        self._db = None
+
+    def _id(self, entry):
+        """Get the id of an entry, None if it has none."""
+        try:
+            return str(dict_lookup(entry, self._id_path))
+        except KeyError:
+            return None
+
+    def _spill(self):
+        """Move the seen ids to a temporary on-disk database."""
+        # an empty name creates a database deleted once closed
+        self._db = sqlite3.connect("", isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute(
+            "CREATE TABLE seen (id TEXT PRIMARY KEY) WITHOUT ROWID"
+        )
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "INSERT INTO seen VALUES (?)", ((id_, ) for id_ in self._seen)
+        )
+        self._db.execute("COMMIT")
+        self._seen = set()
+
+    def filter(self, stream_entry, *args, **kwargs):
+        """Checks if the entry id was already seen."""
+        id_ = self._id(stream_entry.entry)
+        if id_ is None:
+            return False
+
+        if self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO seen VALUES (?)", (id_, )
+            )
+            return cursor.rowcount == 0
+
+        if id_ in self._seen:
+            return True
+        self._seen.add(id_)
+        if len(self._seen) > self._max_in_memory:
+            self._spill()
+        return False
+
+    def close(self):
+        """Forget the seen ids, deleting the on-disk database if any."""
+        if self._db:
+            self._db.close()
+            self._db = None
+        self._seen = set()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""On-disk cache of HTTP responses."""
+
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+CachedResponse = namedtuple(
+    "CachedResponse", ["etag", "last_modified", "content"]
+)
+"""A cached response body with its validators."""
+
+
+class HTTPCache:
+    """Cache of HTTP responses, stored in a SQLite file.
+
+    Responses are cached by URL and Accept header, along with their `ETag`
+    and `Last-Modified` validators so they can be revalidated with a
+    conditional request. Responses without validators are not cached. It
+    can be used from several threads.
+    """
+
+    def __init__(self, path):
+        """Constructor.
+
+        :param path: path of the cache file, created if it does not exist.
+        """
+        self._db = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT, accept TEXT, etag TEXT, last_modified TEXT,
+                content BLOB, updated TEXT, PRIMARY KEY (url, accept)
+            )
+        """)
+        self._lock = threading.Lock()
+
+    def get(self, url, accept=None):
+        """Get the cached response of an URL, None if not cached."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content FROM responses "
+                "WHERE url = ? AND accept = ?",
+                (url, accept or "")
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def set(self, url, accept, etag, last_modified, content):
+        """Cache a response, if it has validators."""
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url, accept or "", etag, last_modified, content,
+                    datetime.utcnow().isoformat(),
+                )
+            )
+
+    def close(self):
+        """Close the cache file."""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Data streams instrumentation module."""
+
+from bisect import bisect_left
+
+
+class Instrumentation:
+    """Data stream instrumentation.
+
+    It is called with the time spent, in seconds, in each stage of a data
+    stream. This base implementation does nothing.
+    """
+
+    def on_read(self, reader, elapsed):
+        """Called after reading an entry."""
+        pass
+
+    def on_transform(self, transformer, elapsed):
+        """Called after a transformer is applied to an entry."""
+        pass
+
+    def on_write(self, writer, elapsed, entries=1):
+        """Called after a writer writes one entry or a batch of them."""
+        pass
+
+
+class Histogram:
+    """Histogram of durations with fixed buckets."""
+
+    BUCKETS = (
+        0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10
+    )
+    """Upper bounds of the buckets in seconds, plus an overflow bucket."""
+
+    def __init__(self):
+        """Constructor."""
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.calls = 0
+        self.entries = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed, entries=1):
+        """Adds a duration."""
+        self.counts[bisect_left(self.BUCKETS, elapsed)] += 1
+        self.calls += 1
+        self.entries += entries
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+    def percentile(self, percent):
+        """Upper bound of the bucket containing a percentile."""
+        threshold = self.calls * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return self.BUCKETS[bucket] if bucket < len(self.BUCKETS) \
+                    else self.max
+        return 0.0
+
+
+class StatsCollector(Instrumentation):
+    """Collects the time spent per stage and component class."""
+
+    def __init__(self):
+        """Constructor."""
+        self.histograms = {}
+
+    def _add(self, stage, component, elapsed, entries=1):
+        """Adds a duration to the histogram of a component."""
+        key = (stage, component.__class__.__name__)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.add(elapsed, entries)
+
+    def on_read(self, reader, elapsed):
+        """Collects the read time."""
+        self._add("read", reader, elapsed)
+
+    def on_transform(self, transformer, elapsed):
+        """Collects the transformation time."""
+        self._add("transform", transformer, elapsed)
+
+    def on_write(self, writer, elapsed, entries=1):
+        """Collects the write time."""
+        self._add("write", writer, elapsed, entries)
+
+    def summary(self):
+        """Text table with the time spent per stage and component."""
+        lines = [
+            f"{'Stage':<10} {'Component':<30} {'Entries':>10} "
+            f"{'Total s':>10} {'ms/entry':>10} {'p95 ms/call':>12}"
+        ]
+        for (stage, name), histogram in self.histograms.items():
+            mean = histogram.total / max(histogram.entries, 1) * 1000
+            p95 = histogram.percentile(95) * 1000
+            lines.append(
+                f"{stage:<10} {name:<30} {histogram.entries:>10} "
+                f"{histogram.total:>10.2f} {mean:>10.3f} {p95:>12.2f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Rate limiting of the data stream components."""
+
+import json
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket rate limiter.
+
+    The bucket holds up to `burst` tokens and is refilled at `rate` tokens
+    per second. Taking more tokens than available reserves them in advance,
+    and the caller waits until they are refilled. Concurrent callers are
+    therefore spaced out instead of all waking up at once.
+
+    The rate can be changed at runtime by setting the `cache_key` in the
+    cache, e.g. to slow down an import during business hours. The cached
+    value is read at most every `refresh` seconds, which needs an
+    application context and `invenio-cache`, e.g. the `cache` extra.
+    """
+
+    UNITS = ("entries", "bytes")
+
+    def __init__(
+        self, rate, burst=None, unit="entries", cache_key=None, refresh=5,
+        clock=time.monotonic, sleep=time.sleep
+    ):
+        """Constructor.
+
+        :param rate: tokens per second. A None or non-positive rate does not
+                     limit.
+        :param burst: maximum number of tokens taken at once without
+                      waiting, defaults to one second worth of tokens.
+        :param unit: what a token stands for, `entries` or `bytes`.
+        :param cache_key: cache key of a rate overriding the configured one.
+        :param refresh: seconds between the reads of the cached rate.
+        :param clock: function returning the current time in seconds.
+        :param sleep: function called to wait.
+        """
+        if unit not in self.UNITS:
+            raise ValueError(f"Unit must be one of {', '.join(self.UNITS)}.")
+        self._default_rate = rate
+        self._rate = rate
+        self._burst = burst
+        self._unit = unit
+        self._cache_key = cache_key
+        self._refresh = refresh
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._last = clock()
+        self._refreshed = None
+        self._tokens = self._capacity()
+
+    @property
+    def rate(self):
+        """Current rate in tokens per second."""
+        return self._rate
+
+    def _capacity(self):
+        """Maximum number of tokens in the bucket."""
+        return self._burst or self._rate or 0
+
+    def _refresh_rate(self, now):
+        """Read the rate from the cache, if it is time to."""
+        if not self._cache_key or (
+            self._refreshed is not None
+            and now - self._refreshed < self._refresh
+        ):
+            return
+        self._refreshed = now
+        # imported on use, only a cached rate needs invenio-cache
+        from invenio_cache import current_cache
+        rate = current_cache.get(self._cache_key)
+        self._rate = self._default_rate if rate is None else float(rate)
+
+    def cost(self, stream_entries):
+        """Number of tokens needed to process some entries."""
+        if self._unit == "entries":
+            return len(stream_entries)
+
+        size = 0
+        for stream_entry in stream_entries:
+            entry = stream_entry.entry
+            if isinstance(entry, str):
+                entry = entry.encode("utf-8")
+            elif not isinstance(entry, (bytes, bytearray)):
+                entry = json.dumps(entry, default=str).encode("utf-8")
+            size += len(entry)
+        return size
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket without waiting.
+
+        :returns: the seconds to wait before using them.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refresh_rate(now)
+            if not self._rate or self._rate <= 0:
+                self._last = now
+                return 0
+
+            self._tokens = min(
+                self._capacity(),
+                self._tokens + (now - self._last) * self._rate
+            )
+            self._last = now
+            self._tokens -= tokens
+            return max(-self._tokens / self._rate, 0)
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, waiting until they are available."""
+        wait = self.reserve(tokens)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def acquire_for(self, stream_entries):
+        """Take the tokens needed to process some entries."""
+        return self.acquire(self.cost(stream_entries))
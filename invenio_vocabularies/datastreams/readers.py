@@ -8,14 +8,49 @@
 
 """Readers module."""
 
+import asyncio
+import base64
+import bisect
+import csv
+import glob
+import json
+import mmap
+import os
+import queue
 import re
 import tarfile
+import threading
 from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, \
+    as_completed, wait
+from contextlib import contextmanager
 
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
+from yaml.composer import Composer
+from yaml.events import CollectionEndEvent, CollectionStartEvent, \
+    SequenceEndEvent, SequenceStartEvent, StreamEndEvent
 
-from .datastreams import StreamEntry
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+from .compression import detect_compression, open_file
+from .datastreams import StreamEntry, bind_app_context
+from .errors import ReaderError, RetryableError
+from .factories import ReaderFactory
+from .httpcache import HTTPCache
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .tarindex import TarIndex, index_lock, temp_path
 
 
 class BaseReader(ABC):
@@ -26,65 +61,1171 @@ class BaseReader(ABC):
         self._origin = origin
 
     @abstractmethod
-    def read(self, *args, **kwargs):
+    def read(self, position=None, *args, **kwargs):
         """Reads the content from the origin.
 
+        :param position: reader specific position to resume reading from,
+                         as given in the `position` of the yielded entries.
+                         Readers that cannot resume ignore it.
+
         Yields `StreamEntry` objects.
         """
         pass
 
+    def count(self, position=None, *args, **kwargs):
+        """Counts the entries the reader would yield from a position.
+
+        Readers that cannot count their entries cheaply raise
+        NotImplementedError.
+        """
+        raise NotImplementedError()
+
+    def count_is_cheap(self):
+        """Checks if counting does not need to go through the origin.
+
+        Readers counting their entries by reading them all return False.
+        """
+        return False
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the origin in ranges of positions that can be read apart.
+
+        By default, the positions are assumed to be entry indexes, so the
+        entries are split evenly by count.
+
+        :param num_partitions: maximum number of partitions.
+        :returns: a list of `(start, stop)` positions.
+        """
+        return _split(self.count(), num_partitions)
+
+
+class BaseFileReader(BaseReader):
+    """Base reader of files.
+
+    Compressed files, with gzip, bz2, xz or zstd, are detected and
+    decompressed in a background thread while the reader parses them.
+    """
+
+    def __init__(self, *args, decompress_workers=None, **kwargs):
+        """Constructor.
+
+        :param decompress_workers: number of threads decompressing the
+                                   blocks of BGZF compressed files.
+        """
+        super().__init__(*args, **kwargs)
+        self._decompress_workers = decompress_workers
+
+    def _open(self, mode="rb", **kwargs):
+        """Open the file, decompressed if it is compressed."""
+        return open_file(
+            self._origin, mode, workers=self._decompress_workers, **kwargs
+        )
+
+
+def _split(size, num_partitions):
+    """Splits the positions up to size in even `(start, stop)` ranges."""
+    num_partitions = max(min(num_partitions, size), 1)
+    bounds = [size * idx // num_partitions for idx in range(num_partitions)]
+    return list(zip(bounds, bounds[1:] + [size]))
+
+
+def _split_offsets(offsets, num_partitions):
+    """Splits the lines ending at some offsets in even byte ranges."""
+    return [
+        (offsets[start - 1] if start else 0, offsets[stop - 1] if stop else 0)
+        for start, stop in _split(len(offsets), num_partitions)
+    ]
+
+
+class AsyncBaseReader(ABC):
+    """Base asynchronous reader."""
+
+    def __init__(self, origin, *args, **kwargs):
+        """Constructor."""
+        self._origin = origin
+
+    @abstractmethod
+    def read(self, *args, **kwargs):
+        """Reads the content from the origin.
+
+        Asynchronous generator of `StreamEntry` objects.
+        """
+        pass
+
+
+class AsyncReaderAdapter(AsyncBaseReader):
+    """Adapts a synchronous reader to the asynchronous interface.
 
-class YamlReader(BaseReader):
-    """Yaml reader."""
+    The synchronous reader runs in a background thread reading entries in
+    advance, so the event loop is not blocked while the reader waits for
+    I/O, and readers fetching concurrently, e.g. a `SimpleHTTPReader` with
+    a `concurrency`, keep several requests in flight.
+    """
 
-    def read(self):
-        """Reads a yaml file and returns a dictionary per element."""
-        with open(self._origin) as f:
-            data = yaml.safe_load(f) or []
-            for entry in data:
-                yield StreamEntry(entry)
+    POLL_INTERVAL = 0.1
+    """Seconds between checks of the stop signal while the queue is full."""
 
+    def __init__(self, reader, *args, prefetch=1000, **kwargs):
+        """Constructor.
 
-class TarReader(BaseReader):
-    """Tar reader."""
+        :param reader: a synchronous reader instance.
+        :param prefetch: maximum number of entries read in advance.
+        """
+        self._reader = reader
+        self._prefetch = prefetch
+        super().__init__(getattr(reader, "_origin", None), *args, **kwargs)
 
-    def __init__(self, *args, mode="r|gz", regex=None, **kwargs):
+    async def read(self, *args, **kwargs):
+        """Reads the entries of the synchronous reader."""
+        loop = asyncio.get_running_loop()
+        prefetched = asyncio.Queue()
+        # bounds the entries read in advance
+        slots = threading.Semaphore(self._prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            """Queue an item in the event loop, unless stopped."""
+            while not stop.is_set():
+                if slots.acquire(timeout=self.POLL_INTERVAL):
+                    loop.call_soon_threadsafe(prefetched.put_nowait, item)
+                    return True
+            return False
+
+        @bind_app_context
+        def produce():
+            """Queue the entries, then None or the error that stopped them."""
+            entries = iter(self._reader.read(*args, **kwargs))
+            try:
+                for stream_entry in entries:
+                    if not put(stream_entry):
+                        return
+            except Exception as err:
+                put(err)
+            else:
+                put(None)
+            finally:
+                if hasattr(entries, "close"):
+                    entries.close()
+
+        thread = threading.Thread(
+            target=produce, name="datastream-reader", daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                item = await prefetched.get()
+                slots.release()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            await loop.run_in_executor(None, thread.join)
+
+
+class _StreamingYamlLoader(SafeLoader, Composer):
+    """Safe loader able to compose the nodes of a document one by one.
+
+    The C based loader, when available, does not expose `compose_node`, so
+    it is taken from the pure Python composer. Parsing, the slowest part,
+    is still done in C.
+    """
+
+    def __init__(self, stream):
         """Constructor."""
+        super().__init__(stream)
+        self.anchors = {}
+
+
+class YamlReader(BaseFileReader):
+    """Yaml reader.
+
+    The elements of the top level sequence are loaded one at a time, so
+    the file is never fully loaded in memory.
+    """
+
+    def _elements(self, loader):
+        """Consume the events up to the first element of the sequence.
+
+        :returns: False if the file is empty.
+        """
+        loader.get_event()  # stream start
+        if loader.check_event(StreamEndEvent):
+            return False
+        loader.get_event()  # document start
+        if loader.check_event(SequenceStartEvent):
+            loader.get_event()
+            return True
+
+        if loader.construct_document(loader.compose_node(None, None)):
+            raise ReaderError(f"{self._origin} is not a YAML sequence.")
+        return False
+
+    def read(self, position=None, *args, **kwargs):
+        """Reads a yaml file and returns a dictionary per element.
+
+        The position is the index of the next element.
+        """
+        start = position or 0
+        with self._open("rt") as f:
+            loader = _StreamingYamlLoader(f)
+            try:
+                if not self._elements(loader):
+                    return
+                idx = 0
+                while not loader.check_event(SequenceEndEvent):
+                    # skipped elements are composed too, for their anchors
+                    node = loader.compose_node(None, None)
+                    idx += 1
+                    if idx > start:
+                        entry = loader.construct_document(node)
+                        yield StreamEntry(entry, position=idx)
+            finally:
+                loader.dispose()
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the elements of the yaml sequence, without loading them."""
+        with self._open("rt") as f:
+            loader = _StreamingYamlLoader(f)
+            try:
+                if not self._elements(loader):
+                    return 0
+                count, depth = 0, 0
+                while depth or not loader.check_event(SequenceEndEvent):
+                    event = loader.get_event()
+                    if not depth:
+                        count += 1
+                    if isinstance(event, CollectionStartEvent):
+                        depth += 1
+                    elif isinstance(event, CollectionEndEvent):
+                        depth -= 1
+            finally:
+                loader.dispose()
+        return max(count - (position or 0), 0)
+
+
+class TarReader(BaseFileReader):
+    """Tar reader.
+
+    By default the archive is read sequentially as a stream, decompressed
+    in a background thread. With `index`, the members are read through a
+    `TarIndex` of the archive instead, so reading can start at any member
+    and several members can be extracted at once. BGZF archives are valid
+    gzip files, but the `r|gz` stream mode of `tarfile` only reads their
+    first block, they must be opened with `r:gz` if a mode is given.
+    """
+
+    def __init__(
+        self, *args, mode=None, regex=None, index=False, index_path=None,
+        workers=None, **kwargs
+    ):
+        """Constructor.
+
+        :param mode: mode to open the archive with `tarfile`, by default its
+                     compression is detected. Ignored with an index.
+        :param regex: if set, only the members whose name matches it are
+                      read.
+        :param index: if True, the archive is read through an index built
+                      on first use. It must be uncompressed or BGZF
+                      compressed.
+        :param index_path: path of the index file, defaults to the archive
+                           path with an `.idx` suffix.
+        :param workers: number of threads extracting the members, with an
+                        index. The entries are still yielded in order.
+        """
+        super().__init__(*args, **kwargs)
         self._regex = re.compile(regex) if regex else None
         self._mode = mode
-        super().__init__(*args, **kwargs)
+        self._index = TarIndex(self._origin, index_path) if index else None
+        self._workers = workers
+
+    def read(self, position=None, *args, **kwargs):
+        """Opens a tar and iterates through the files in the archive.
+
+        The position is the index of the next member in the archive. Members
+        before it are skipped without being extracted.
+        """
+        start = position or 0
+        if self._index:
+            yield from self._read_indexed(start)
+            return
 
-    def read(self):
-        """Opens a tar and iterates through the files in the archive."""
-        with tarfile.open(self._origin, self._mode) as archive:
-            for member in archive:
-                match = not self._regex or self._regex.search(member.name)
-                if member.isfile() and match:
+        with self._archive() as archive:
+            for idx, member in enumerate(archive, 1):
+                if idx <= start:
+                    continue
+                if self._match(member):
                     content = archive.extractfile(member).read()
-                    yield StreamEntry(content)
+                    yield StreamEntry(content, position=idx)
+
+    @contextmanager
+    def _archive(self):
+        """Open the archive as a stream."""
+        if self._mode:
+            with tarfile.open(self._origin, self._mode) as archive:
+                yield archive
+            return
+
+        with self._open() as f, \
+                tarfile.open(fileobj=f, mode="r|") as archive:
+            yield archive
+
+    def _read_indexed(self, start):
+        """Reads the members after `start` seeking them with the index."""
+        members = (
+            (idx, offset, size)
+            for idx, name, offset, size in self._index.members(start)
+            if not self._regex or self._regex.search(name)
+        )
+        archive = self._index.open()
+        try:
+            if not self._workers:
+                for idx, offset, size in members:
+                    yield StreamEntry(
+                        archive.read(offset, size), position=idx
+                    )
+                return
+
+            with ThreadPoolExecutor(self._workers) as executor:
+                pending = deque()
+                for idx, offset, size in members:
+                    pending.append(
+                        (idx, executor.submit(archive.read, offset, size))
+                    )
+                    # bounds the memory used by the extracted members
+                    if len(pending) >= self._workers * 4:
+                        idx, future = pending.popleft()
+                        yield StreamEntry(future.result(), position=idx)
+                while pending:
+                    idx, future = pending.popleft()
+                    yield StreamEntry(future.result(), position=idx)
+        finally:
+            archive.close()
+
+    def _match(self, member):
+        """Checks if a member would be read."""
+        return member.isfile() and (
+            not self._regex or self._regex.search(member.name)
+        )
+
+    def count_is_cheap(self):
+        """Checks if the members are counted with an existing index."""
+        return self._index is not None and self._index.is_built()
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the matching members scanning the archive headers."""
+        start = position or 0
+        if self._index:
+            return sum(
+                1 for _, name, _, _ in self._index.members(start)
+                if not self._regex or self._regex.search(name)
+            )
+
+        with self._archive() as archive:
+            return sum(
+                1 for idx, member in enumerate(archive, 1)
+                if idx > start and self._match(member)
+            )
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the archive in ranges of members.
+
+        Compressed archives must be read through an index, otherwise each
+        partition would decompress the archive up to its members.
+        """
+        if self._index:
+            return _split(self._index.size(), num_partitions)
+        if detect_compression(self._origin):
+            raise NotImplementedError(
+                "Compressed archives can only be partitioned with an index, "
+                "e.g. BGZF compressed with `bgzip`."
+            )
+
+        with self._archive() as archive:
+            size = sum(1 for _ in archive)
+        return _split(size, num_partitions)
+
+
+class JsonLinesReader(BaseFileReader):
+    """JSON Lines (NDJSON) reader.
+
+    The file is memory mapped and each line decoded on its own, with
+    `orjson` if installed. Positions are byte offsets, so reading can
+    resume at any line without going through the ones before, and the file
+    is partitioned in byte ranges.
+
+    Optionally, an index with the offset of each line is built on first
+    use, to count the lines and partition them evenly without reading the
+    whole file. It is memory mapped as well, and rebuilt if the file
+    changes. Blank lines are skipped, lines that are not valid JSON are
+    read as entries with errors.
+
+    Compressed files cannot be memory mapped, they are read as a stream
+    and positions are offsets in the decompressed content. Resuming reads
+    and skips the lines before.
+    """
+
+    def __init__(self, *args, index=False, index_path=None, **kwargs):
+        """Constructor.
+
+        :param index: if True, use an index of the line offsets.
+        :param index_path: path of the index file, defaults to the file
+                           path with an `.idx` suffix.
+        """
+        super().__init__(*args, **kwargs)
+        self._use_index = index
+        self._index_path = str(index_path or f"{self._origin}.idx")
+
+    def _mmap(self, f):
+        """Memory map a file, None if it is empty."""
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _lines(self, start=0):
+        """Yields the non blank lines after an offset, with their end."""
+        if detect_compression(self._origin):
+            yield from self._compressed_lines(start)
+            return
+
+        with open(self._origin, "rb") as f:
+            data = self._mmap(f)
+            if data is None:
+                return
+            with data:
+                size = len(data)
+                while start < size:
+                    end = data.find(b"\n", start)
+                    end = size if end == -1 else end + 1
+                    line = data[start:end]
+                    start = end
+                    if line.strip():
+                        yield line, end
+
+    def _compressed_lines(self, start=0):
+        """Yields the lines of a compressed file, decompressing all."""
+        end = 0
+        with self._open() as f:
+            for line in f:
+                end += len(line)
+                if end > start and line.strip():
+                    yield line, end
+
+    def read(self, position=None, *args, **kwargs):
+        """Reads the lines after a byte offset.
+
+        The position is the offset of the next line.
+        """
+        for line, end in self._lines(position or 0):
+            try:
+                entry = _json_loads(line)
+            except ValueError as err:
+                yield StreamEntry(
+                    line.decode("utf-8", "replace"), position=end,
+                    errors=[f"{self.__class__.__name__}: {err}"],
+                )
+                continue
+            yield StreamEntry(entry, position=end)
+
+    def _stamp(self):
+        """Identifies the current version of the file."""
+        stat = os.stat(self._origin)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _build_index(self):
+        """Write the offsets of the line ends, after the file stamp."""
+        tmp_path = temp_path(self._index_path)
+        try:
+            with open(tmp_path, "wb") as f:
+                array("Q", self._stamp()).tofile(f)
+                offsets = array("Q")
+                for _, end in self._lines():
+                    offsets.append(end)
+                    if len(offsets) >= 65536:
+                        offsets.tofile(f)
+                        offsets = array("Q")
+                offsets.tofile(f)
+            os.replace(tmp_path, self._index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _index_is_current(self):
+        """Checks if the index exists and matches the file stamp."""
+        stamp = array("Q")
+        try:
+            with open(self._index_path, "rb") as f:
+                stamp.fromfile(f, 2)
+        except (OSError, EOFError):
+            return False
+        return stamp.tolist() == self._stamp()
+
+    @contextmanager
+    def _offsets(self):
+        """The memory mapped line end offsets, building the index if needed.
+
+        The first two values are the file size and modification time.
+        """
+        if not self._index_is_current():
+            with index_lock(self._index_path):
+                # it might have been built while waiting for the lock
+                if not self._index_is_current():
+                    self._build_index()
+
+        with open(self._index_path, "rb") as f:
+            data = self._mmap(f)
+        view = memoryview(data).cast("Q")
+        offsets = view[2:]
+        try:
+            yield offsets
+        finally:
+            # the map cannot be closed while viewed
+            offsets.release()
+            view.release()
+            data.close()
+
+    def count_is_cheap(self):
+        """Checks if the lines are counted with an up to date index."""
+        return self._use_index and self._index_is_current()
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the lines after a byte offset."""
+        if not self._use_index:
+            return sum(1 for _ in self._lines(position or 0))
+
+        with self._offsets() as offsets:
+            return len(offsets) - bisect.bisect_right(offsets, position or 0)
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the file in byte ranges.
+
+        With an index, or if compressed, the ranges have the same number of
+        lines, otherwise the same size, adjusted to line ends.
+        """
+        if self._use_index:
+            with self._offsets() as offsets:
+                return _split_offsets(offsets, num_partitions)
+        if detect_compression(self._origin):
+            # the decompressed size is not known without decompressing
+            offsets = array("Q", (end for _, end in self._lines()))
+            return _split_offsets(offsets, num_partitions)
+
+        with open(self._origin, "rb") as f:
+            data = self._mmap(f)
+            if data is None:
+                return [(0, 0)]
+            with data:
+                size = len(data)
+                bounds = [0]
+                for start, _ in _split(size, num_partitions)[1:]:
+                    end = data.find(b"\n", start - 1)
+                    end = size if end == -1 else end + 1
+                    if bounds[-1] < end < size:
+                        bounds.append(end)
+        return list(zip(bounds, bounds[1:] + [size]))
+
+
+def _to_bool(value):
+    """Converts a spreadsheet cell to a boolean."""
+    return value.strip().lower() in ("1", "true", "yes", "y")
+
+
+_CSV_TYPES = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": _to_bool,
+}
+"""Converters of the cells, by column type."""
+
+
+def _compile_column(spec):
+    """Compile a column spec to the path of its field and a converter."""
+    if isinstance(spec, str):
+        spec = {"field": spec}
+
+    type_ = spec.get("type", "str")
+    if type_ == "list":
+        item_type = spec.get("items", "str")
+        if item_type not in _CSV_TYPES:
+            raise ValueError(f"Unknown column items type {item_type}.")
+        separator = spec.get("separator", ";")
+        to_item = _CSV_TYPES[item_type]
+
+        def convert(value):
+            return [
+                to_item(item.strip()) for item in value.split(separator)
+                if item.strip()
+            ]
+    elif type_ in _CSV_TYPES:
+        convert = _CSV_TYPES[type_]
+    else:
+        raise ValueError(f"Unknown column type {type_}.")
+
+    return spec["field"].split("."), convert
+
+
+class CsvReader(BaseFileReader):
+    """CSV reader, e.g. for vocabularies maintained in spreadsheets.
+
+    The rows are read one at a time and mapped to nested entries with a
+    spec of the columns, compiled once. For example:
+
+    .. code-block:: python
+
+        {
+            "ID": "id",
+            "Title": "title.en",
+            "Tags": {"field": "tags", "type": "list", "separator": ";"},
+            "Order": {"field": "props.order", "type": "int"},
+        }
+
+    The column types are `str`, `int`, `float`, `bool` and `list`, whose
+    items are strings unless their type is given in `items`. Without spec,
+    the header of each column is the path of its field. Empty cells are
+    left out of the entries.
+
+    With a `chunk_size`, the rows are read in batches, each entry holding
+    the columns of a chunk of rows.
+    """
+
+    DELIMITER = ","
+
+    def __init__(
+        self, *args, columns=None, delimiter=None, encoding="utf-8-sig",
+        chunk_size=None, **kwargs
+    ):
+        """Constructor.
+
+        :param columns: the spec of the columns to read, by header.
+        :param delimiter: the cells delimiter, defaults to `DELIMITER`.
+        :param encoding: encoding of the file, by default UTF-8 with or
+                         without byte order mark.
+        :param chunk_size: if set, entries are chunks of this many rows, as
+                           given by `read_chunks`, for transformers and
+                           writers handling columns.
+        """
+        super().__init__(*args, **kwargs)
+        self._columns = {
+            name: _compile_column(spec) for name, spec in columns.items()
+        } if columns else None
+        self._delimiter = delimiter or self.DELIMITER
+        self._encoding = encoding
+        self._chunk_size = chunk_size
+
+    def _rows(self, start=0):
+        """Yields the rows after the `start`-th one, with their index."""
+        with self._open("rt", newline="", encoding=self._encoding) as f:
+            rows = csv.reader(f, delimiter=self._delimiter)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = self._compile(header)
+            for idx, row in enumerate(rows, 1):
+                if idx > start and any(row):
+                    yield idx, row, columns
+
+    def _compile(self, header):
+        """Resolve the columns index in the header.
+
+        :returns: a list of `(index, path, convert)` tuples.
+        """
+        if self._columns is None:
+            return [
+                (idx, *_compile_column(name))
+                for idx, name in enumerate(header) if name
+            ]
+
+        compiled = []
+        for name, (path, convert) in self._columns.items():
+            try:
+                compiled.append((header.index(name), path, convert))
+            except ValueError:
+                raise ReaderError(f"Column {name} not in {self._origin}.")
+        return compiled
+
+    def _map(self, row, columns):
+        """Maps a row to an entry."""
+        entry = {}
+        for idx, path, convert in columns:
+            value = row[idx] if idx < len(row) else ""
+            if not value:
+                continue
+            parent = entry
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[path[-1]] = convert(value)
+        return entry
+
+    def read(self, position=None, *args, **kwargs):
+        """Reads the rows as entries, or chunks of rows with a `chunk_size`.
+
+        The position is the index of the next row, blank ones included.
+        """
+        if self._chunk_size:
+            yield from self.read_chunks(self._chunk_size, position)
+            return
+
+        for idx, row, columns in self._rows(position or 0):
+            try:
+                yield StreamEntry(self._map(row, columns), position=idx)
+            except ValueError as err:
+                yield StreamEntry(
+                    row, position=idx,
+                    errors=[f"{self.__class__.__name__}: row {idx}: {err}"],
+                )
+
+    def read_chunks(self, chunk_size=1000, position=None):
+        """Reads the rows by chunks of columns.
+
+        Each entry has the `columns`, a dict of the field paths, e.g.
+        `title.en`, to the list of values of the rows in the chunk, None for
+        empty cells, and the list of `errors` of each row. Cells that cannot
+        be converted are None as well, so all the columns have a value per
+        row. The position is the one of the last row in the chunk.
+        """
+        keys, chunk, errors = None, None, None
+        for idx, row, columns in self._rows(position or 0):
+            if keys is None:
+                keys = [".".join(path) for _, path, _ in columns]
+            if chunk is None:
+                chunk, errors = {key: [] for key in keys}, []
+
+            row_errors = []
+            for key, (col, _, convert) in zip(keys, columns):
+                value = row[col] if col < len(row) else ""
+                try:
+                    chunk[key].append(convert(value) if value else None)
+                except ValueError as err:
+                    chunk[key].append(None)
+                    row_errors.append(
+                        f"{self.__class__.__name__}: row {idx}: {key}: {err}"
+                    )
+            errors.append(row_errors)
+            if len(errors) >= chunk_size:
+                yield StreamEntry(
+                    {"columns": chunk, "errors": errors}, position=idx
+                )
+                chunk = None
+
+        if chunk:
+            yield StreamEntry(
+                {"columns": chunk, "errors": errors}, position=idx
+            )
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the rows that are not blank, or their chunks."""
+        rows = sum(1 for _ in self._rows(position or 0))
+        if self._chunk_size:
+            return -(-rows // self._chunk_size)
+        return rows
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the rows in ranges, unless they are read by chunks."""
+        if self._chunk_size:
+            raise NotImplementedError(
+                "Chunks of rows would be cut at the end of the partitions."
+            )
+        with self._open("rt", newline="", encoding=self._encoding) as f:
+            # positions are row indexes, blank rows included
+            rows = sum(1 for _ in csv.reader(f, delimiter=self._delimiter))
+        return _split(max(rows - 1, 0), num_partitions)
+
+
+class TsvReader(CsvReader):
+    """Tab separated values reader."""
+
+    DELIMITER = "\t"
+
+
+class DeadLetterReader(BaseFileReader):
+    """Reads the entries written by a `DeadLetterWriter`.
+
+    The raw entries are yielded, so they can go again through the same
+    transformers and writers.
+    """
+
+    def __init__(self, *args, stages=None, **kwargs):
+        """Constructor.
+
+        :param stages: if set, only the entries failed in one of these
+                       stages (e.g. ["write"]) are read.
+        """
+        self._stages = stages
+        super().__init__(*args, **kwargs)
+
+    def _lines(self):
+        """Yields the decoded lines of the file."""
+        with self._open("rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _match(self, line):
+        """Checks if a line would be read."""
+        return not self._stages or line.get("stage") in self._stages
+
+    def read(self, position=None, *args, **kwargs):
+        """Reads the failed entries.
+
+        The position is the index of the next line.
+        """
+        start = position or 0
+        for idx, line in enumerate(self._lines(), 1):
+            if idx <= start or not self._match(line):
+                continue
+            entry = line["entry"]
+            if line.get("encoding") == "base64":
+                entry = base64.b64decode(entry)
+            yield StreamEntry(entry, position=idx)
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the failed entries."""
+        start = position or 0
+        return sum(
+            1 for idx, line in enumerate(self._lines(), 1)
+            if idx > start and self._match(line)
+        )
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the file in ranges of lines."""
+        return _split(sum(1 for _ in self._lines()), num_partitions)
 
 
 class SimpleHTTPReader(BaseReader):
-    """Simple HTTP Reader."""
+    """Simple HTTP Reader.
+
+    The requests go through a session, reusing the connections. Several
+    requests can be made at once in threads, the entries are still yielded
+    in the order of the ids unless `ordered` is False. Then they are
+    yielded as soon as they are fetched, without position, so reading
+    cannot be resumed.
+
+    Requests failing with a transient error, e.g. a connection error or a
+    429 or 5xx response, are retried with an exponential backoff. Ids that
+    could not be fetched are read as entries with errors.
+
+    With an `http_cache`, the responses are kept on disk and revalidated
+    on later reads with conditional requests, so unchanged content is not
+    transferred again.
+    """
 
     def __init__(
-        self, origin, id=None, ids=None, content_type=None, *args, **kwargs
+        self, origin, id=None, ids=None, content_type=None, *args,
+        retry=None, timeout=60, requests_per_second=None, concurrency=1,
+        ordered=True, http_cache=None, skip_unchanged=False, **kwargs
     ):
-        """Constructor."""
+        """Constructor.
+
+        :param retry: arguments of the `RetryPolicy` of the requests.
+        :param timeout: seconds to wait for the server to respond.
+        :param requests_per_second: maximum rate of requests, retries
+                                    included, to comply with the server
+                                    usage policy.
+        :param concurrency: maximum number of requests made at once.
+        :param ordered: if False, entries are yielded as soon as fetched.
+        :param http_cache: path of the file to cache the responses in.
+        :param skip_unchanged: if True, the ids whose cached response is
+                               still valid are not read at all.
+        """
         assert id or ids
         self._ids = ids if ids else [id]
         self.content_type = content_type
+        self._retry = RetryPolicy(**(retry or {}))
+        self._timeout = timeout
+        self._rate_limit = RateLimiter(requests_per_second) \
+            if requests_per_second else None
+        self._concurrency = concurrency
+        self._ordered = ordered
+        self._http_cache_path = http_cache
+        self._skip_unchanged = skip_unchanged
+        self._http_cache = None
+        super().__init__(origin, *args, **kwargs)
+
+    def _session(self):
+        """A session keeping a connection alive per concurrent request."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._concurrency
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if self.content_type:
+            session.headers["Accept"] = self.content_type
+        return session
+
+    def _fetch(self, session, url):
+        """Get the content of an url, revalidating the cached one if any.
+
+        :returns: the content and whether it changed since cached.
+        """
+        cached, headers = None, {}
+        if self._http_cache:
+            cached = self._http_cache.get(url, self.content_type)
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        if self._rate_limit:
+            self._rate_limit.acquire()
+        resp = session.get(url, headers=headers, timeout=self._timeout)
+        if resp.status_code == 304 and cached:
+            return cached.content, False
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise RetryableError(f"{url} responded {resp.status_code}")
+        if resp.status_code != 200:
+            raise ReaderError(f"{url} responded {resp.status_code}")
+
+        if self._http_cache:
+            self._http_cache.set(
+                url, self.content_type, resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"), resp.content
+            )
+        return resp.content, True
+
+    def _get(self, session, idx, id_):
+        """Fetch an id as an entry, with errors if it failed.
+
+        :returns: None if the id is skipped as unchanged.
+        """
+        url = self._origin.format(id=id_)
+        try:
+            content, changed = self._retry.call(self._fetch, session, url)
+        except (
+            ReaderError, RetryableError, requests.RequestException
+        ) as err:
+            return StreamEntry(
+                None, position=idx,
+                errors=[f"{self.__class__.__name__}: {err}"],
+            )
+        if not changed and self._skip_unchanged:
+            return None
+        return StreamEntry(content, position=idx)
+
+    def read(self, position=None, *args, **kwargs):
+        """Fetches the ids and returns their content per entry.
+
+        The position is the index of the next id.
+        """
+        start = position or 0
+        ids = enumerate(self._ids[start:], start + 1)
+
+        if self._http_cache_path:
+            self._http_cache = HTTPCache(self._http_cache_path)
+        entries = self._read(ids)
+        try:
+            for stream_entry in entries:
+                if stream_entry is not None:
+                    yield stream_entry
+        finally:
+            # waits for the pending requests before closing the cache
+            entries.close()
+            if self._http_cache:
+                self._http_cache.close()
+                self._http_cache = None
+
+    def _read(self, ids):
+        """Fetches the ids, None for the skipped ones."""
+        with self._session() as session:
+            if self._concurrency <= 1:
+                for idx, id_ in ids:
+                    yield self._get(session, idx, id_)
+                return
+
+            with ThreadPoolExecutor(self._concurrency) as executor:
+                # bounds the fetched entries waiting to be yielded
+                window = self._concurrency * 2
+                if self._ordered:
+                    pending = deque()
+                    for idx, id_ in ids:
+                        pending.append(
+                            executor.submit(self._get, session, idx, id_)
+                        )
+                        if len(pending) >= window:
+                            yield pending.popleft().result()
+                    while pending:
+                        yield pending.popleft().result()
+                    return
+
+                pending = set()
+                for idx, id_ in ids:
+                    pending.add(executor.submit(self._get, session, idx, id_))
+                    if len(pending) >= window:
+                        done, pending = wait(
+                            pending, return_when=FIRST_COMPLETED
+                        )
+                        yield from self._unordered(done)
+                yield from self._unordered(as_completed(pending))
+
+    def _unordered(self, futures):
+        """Entries of completed futures, without position."""
+        for future in futures:
+            stream_entry = future.result()
+            if stream_entry is not None:
+                stream_entry.position = None
+            yield stream_entry
+
+    def count_is_cheap(self):
+        """The ids to fetch are known."""
+        return True
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the ids to fetch."""
+        return max(len(self._ids) - (position or 0), 0)
+
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the ids in ranges, unless the entries have no position."""
+        if not self._ordered and self._concurrency > 1:
+            raise NotImplementedError(
+                "Unordered entries have no position to partition them by."
+            )
+        return super().partitions(num_partitions, *args, **kwargs)
+
+
+class CompositeReader(BaseReader):
+    """Reads the entries of several readers.
+
+    The readers are given as a list of configs, or as a glob pattern of
+    origins each read with the same reader config. They are read one after
+    the other, or several at once in threads with their entries
+    interleaved.
+
+    When reading sequentially, positions are `[index, position]` pairs of
+    the reader index and its own position. Interleaved entries have no
+    position, so they cannot be resumed nor partitioned.
+    """
+
+    POLL_INTERVAL = 0.1
+    """Seconds between checks of the stop signal while waiting on a queue."""
+
+    def __init__(
+        self, origin=None, *args, readers=None, reader=None, concurrency=1,
+        queue_size=1000, **kwargs
+    ):
+        """Constructor.
+
+        :param origin: glob pattern of the origins to read with `reader`.
+        :param readers: list of reader configs.
+        :param reader: reader config, without origin, for the origins
+                       matching the glob pattern.
+        :param concurrency: number of readers read at once.
+        :param queue_size: maximum number of read entries waiting to be
+                           consumed when reading concurrently.
+        """
+        configs = list(readers or [])
+        if origin:
+            reader = reader or {}
+            for path in sorted(glob.glob(origin)):
+                args = dict(reader.get("args", {}), origin=path)
+                configs.append(dict(reader, args=args))
+
+        self._readers = [ReaderFactory.create(config) for config in configs]
+        self._concurrency = concurrency
+        self._queue_size = queue_size
         super().__init__(origin, *args, **kwargs)
 
-    def read(self):
-        """Reads a yaml file and returns a dictionary per element."""
-        headers = {"Accept": self.content_type}
+    def read(self, position=None, *args, **kwargs):
+        """Reads the entries of all the readers."""
+        if self._concurrency > 1:
+            yield from self._read_concurrently()
+            return
+
+        start, start_position = position or (0, None)
+        for idx, reader in enumerate(self._readers[start:], start):
+            if idx == start and start_position is not None:
+                entries = reader.read(position=start_position)
+            else:
+                entries = reader.read()
+            for stream_entry in entries:
+                if stream_entry.position is not None:
+                    stream_entry.position = [idx, stream_entry.position]
+                yield stream_entry
+
+    def _read_concurrently(self):
+        """Reads the readers in threads, yielding entries as they come."""
+        stop = threading.Event()
+        output = queue.Queue(self._queue_size)
+        pending = queue.Queue()
+        for reader in self._readers:
+            pending.put(reader)
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    output.put(item, timeout=self.POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        @bind_app_context
+        def run():
+            try:
+                while not stop.is_set():
+                    try:
+                        reader = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    for stream_entry in reader.read():
+                        stream_entry.position = None
+                        if not put(stream_entry):
+                            return
+            except Exception as err:
+                put(err)
+            finally:
+                put(None)
+
+        workers = [
+            threading.Thread(
+                target=run, name=f"composite-reader-{idx}", daemon=True
+            )
+            for idx in range(min(self._concurrency, len(self._readers)))
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            running = len(workers)
+            while running:
+                try:
+                    item = output.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    def count_is_cheap(self):
+        """Checks if all the readers count cheaply."""
+        return all(reader.count_is_cheap() for reader in self._readers)
 
-        for id_ in self._ids:
-            url = self._origin.format(id=id_)
-            resp = requests.get(url, headers=headers)
-            if resp.status_code != 200:
-                # todo add logging/fail
-                pass
+    def count(self, position=None, *args, **kwargs):
+        """Counts the entries of all the readers."""
+        start, start_position = position or (0, None)
+        total = 0
+        for idx, reader in enumerate(self._readers[start:], start):
+            if idx == start and start_position is not None:
+                total += reader.count(position=start_position)
+            else:
+                total += reader.count()
+        return total
 
-            yield StreamEntry(resp.content)
+    def partitions(self, num_partitions, *args, **kwargs):
+        """Splits the readers in groups read apart."""
+        if self._concurrency > 1:
+            raise NotImplementedError(
+                "Interleaved entries have no position to partition them by."
+            )
+        return [
+            ([start, 0], [stop, 0])
+            for start, stop in _split(len(self._readers), num_partitions)
+        ]
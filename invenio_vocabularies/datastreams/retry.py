@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Retries of transient failures."""
+
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+from sqlalchemy.exc import OperationalError
+from werkzeug.utils import import_string
+
+from .errors import RetryableError
+
+RETRYABLE_ERRORS = (
+    RetryableError,
+    ConnectionError,
+    Timeout,
+    # e.g. deadlocks and lost connections
+    OperationalError,
+)
+"""Exceptions considered transient by default."""
+
+try:
+    # the client depends on the installed search engine version
+    from elasticsearch.exceptions import ConnectionError as ESConnectionError
+
+    # includes the connection timeouts
+    RETRYABLE_ERRORS += (ESConnectionError, )
+except ImportError:
+    pass
+
+
+class RetryPolicy:
+    """Retries calls failing with transient errors.
+
+    The delay before each retry grows exponentially, with full jitter so
+    concurrent callers do not retry in lockstep. A budget limits the total
+    number of retries done with the policy, so a failing service does not
+    slow down a whole run.
+    """
+
+    def __init__(
+        self, max_attempts=3, backoff=0.5, max_backoff=30, budget=None,
+        retry_on=None, sleep=time.sleep
+    ):
+        """Constructor.
+
+        :param max_attempts: maximum number of attempts of a call.
+        :param backoff: base delay in seconds, doubled at each retry.
+        :param max_backoff: maximum delay in seconds.
+        :param budget: maximum number of retries across all calls, None for
+                       unlimited.
+        :param retry_on: exception classes, or their import strings, to
+                         retry. Defaults to `RETRYABLE_ERRORS`.
+        :param sleep: function called to wait between attempts.
+        """
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._budget = budget
+        self._retry_on = tuple(
+            import_string(e) if isinstance(e, str) else e
+            for e in retry_on
+        ) if retry_on else RETRYABLE_ERRORS
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def is_retryable(self, error):
+        """Checks if an error is considered transient."""
+        return isinstance(error, self._retry_on)
+
+    def _consume_budget(self):
+        """Takes one retry from the budget, False if there is none left."""
+        with self._lock:
+            if self._budget is None:
+                return True
+            if self._budget <= 0:
+                return False
+            self._budget -= 1
+            return True
+
+    def delay(self, attempt):
+        """Seconds to wait before retrying after a given attempt."""
+        delay = min(self._max_backoff, self._backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay)
+
+    def call(self, func, *args, **kwargs):
+        """Call a function, retrying it on transient errors.
+
+        The last error is raised if all attempts fail or the budget is
+        exhausted.
+        """
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:
+                if not self.is_retryable(err) \
+                        or attempt >= self._max_attempts \
+                        or not self._consume_budget():
+                    raise
+            self._sleep(self.delay(attempt))
+            attempt += 1
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Random access to the members of tar archives."""
+
+import bisect
+import fcntl
+import gzip
+import os
+import sqlite3
+import struct
+import tarfile
+import tempfile
+import threading
+import zlib
+from contextlib import closing, contextmanager
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def read_bgzf_block_header(f):
+    """Read the header of a BGZF block.
+
+    :returns: the size of the block and of its header, or None at the end
+              of the file.
+    """
+    header = f.read(12)
+    if not header:
+        return None
+    if len(header) < 12 or header[:3] != b"\x1f\x8b\x08" \
+            or not header[3] & 4:
+        raise ValueError("Not a BGZF block.")
+
+    xlen, = struct.unpack("<H", header[10:12])
+    extra = f.read(xlen)
+    pos = 0
+    while pos + 4 <= len(extra):
+        slen, = struct.unpack("<H", extra[pos + 2:pos + 4])
+        if extra[pos:pos + 2] == b"BC" and slen == 2:
+            bsize, = struct.unpack("<H", extra[pos + 4:pos + 6])
+            return bsize + 1, 12 + xlen
+        pos += 4 + slen
+    raise ValueError("Not a BGZF block.")
+
+
+def is_gzip(path):
+    """Checks if a file is gzip compressed."""
+    with open(path, "rb") as f:
+        return f.read(2) == _GZIP_MAGIC
+
+
+def is_bgzf(path):
+    """Checks if a file is BGZF compressed, i.e. made of gzip blocks."""
+    with open(path, "rb") as f:
+        try:
+            return read_bgzf_block_header(f) is not None
+        except ValueError:
+            return False
+
+
+@contextmanager
+def index_lock(path):
+    """Exclusive lock, across processes and threads, to build an index.
+
+    The lock is held on a `.lock` file next to the index, which is left
+    in place.
+    """
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def temp_path(path):
+    """Create a unique temporary file next to a path.
+
+    Files are written in it, then moved in place with `os.replace`, so they
+    are never seen half written.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f"{os.path.basename(path)}.", suffix=".tmp",
+    )
+    os.close(fd)
+    return tmp_path
+
+
+class _ThreadLocalFiles:
+    """Opens a file handle per thread, so threads can seek concurrently."""
+
+    def __init__(self, path):
+        """Constructor."""
+        self._path = path
+        self._local = threading.local()
+        self._files = []
+        self._lock = threading.Lock()
+
+    def _file(self):
+        """The file handle of the current thread."""
+        f = getattr(self._local, "file", None)
+        if f is None:
+            f = self._local.file = open(self._path, "rb")
+            with self._lock:
+                self._files.append(f)
+        return f
+
+    def close(self):
+        """Close the handles of all threads."""
+        with self._lock:
+            for f in self._files:
+                f.close()
+            self._files = []
+        self._local = threading.local()
+
+
+class UncompressedFile(_ThreadLocalFiles):
+    """Random access to an uncompressed file."""
+
+    def read(self, offset, size):
+        """Read `size` bytes from `offset`."""
+        f = self._file()
+        f.seek(offset)
+        return f.read(size)
+
+
+class BGZFFile(_ThreadLocalFiles):
+    """Random access to the uncompressed content of a BGZF file.
+
+    BGZF files, as written by `bgzip`, are a series of gzip members, the
+    blocks, of at most 64KB of uncompressed data each. They are valid gzip
+    files, and the blocks can be decompressed independently from each
+    other.
+    """
+
+    def __init__(self, path, blocks=None):
+        """Constructor.
+
+        :param blocks: the compressed and uncompressed offsets of the
+                       blocks, as given by `scan`. Scanned if not given.
+        """
+        super().__init__(path)
+        self._blocks = blocks if blocks is not None else self.scan(path)
+        self._offsets = [uoffset for _, uoffset in self._blocks]
+
+    @staticmethod
+    def scan(path):
+        """Lists the compressed and uncompressed offsets of the blocks.
+
+        Only the block headers and trailers are read, nothing is
+        decompressed.
+        """
+        blocks = []
+        coffset, uoffset = 0, 0
+        with open(path, "rb") as f:
+            while True:
+                header = read_bgzf_block_header(f)
+                if header is None:
+                    break
+                bsize, _ = header
+                f.seek(coffset + bsize - 4)
+                isize, = struct.unpack("<I", f.read(4))
+                if isize:
+                    blocks.append((coffset, uoffset))
+                coffset += bsize
+                uoffset += isize
+                f.seek(coffset)
+        return blocks
+
+    def _block(self, idx):
+        """Decompress a block, the last one is cached per thread."""
+        cached = getattr(self._local, "block", None)
+        if cached and cached[0] == idx:
+            return cached[1]
+
+        f = self._file()
+        f.seek(self._blocks[idx][0])
+        bsize, hsize = read_bgzf_block_header(f)
+        f.seek(self._blocks[idx][0] + hsize)
+        data = zlib.decompress(f.read(bsize - hsize - 8), -15)
+        self._local.block = (idx, data)
+        return data
+
+    def read(self, offset, size):
+        """Read `size` uncompressed bytes from an uncompressed `offset`."""
+        idx = bisect.bisect_right(self._offsets, offset) - 1
+        skip = offset - self._offsets[idx]
+        chunks = []
+        while size > 0 and idx < len(self._blocks):
+            chunk = self._block(idx)[skip:skip + size]
+            chunks.append(chunk)
+            size -= len(chunk)
+            skip = 0
+            idx += 1
+        return b"".join(chunks)
+
+
+class TarIndex:
+    """Index of the members of a tar archive, stored in a SQLite file.
+
+    It maps the members to the offset of their content, so any of them can
+    be read without going through the ones before. That needs an archive
+    that can be read from any offset, i.e. uncompressed or BGZF compressed
+    (`bgzip archive.tar`). The index is built once, and again if the
+    archive changes. Processes building the same index wait for the first
+    one to finish.
+    """
+
+    def __init__(self, archive, path=None):
+        """Constructor.
+
+        :param archive: path of the tar archive.
+        :param path: path of the index file, defaults to the archive path
+                     with an `.idx` suffix.
+        """
+        self._archive = str(archive)
+        self._path = str(path or f"{archive}.idx")
+        self._db = None
+
+    def _stamp(self):
+        """Identifies the current version of the archive."""
+        stat = os.stat(self._archive)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _open_current(self):
+        """Open the index, None if missing or outdated."""
+        if not os.path.exists(self._path):
+            return None
+        db = sqlite3.connect(self._path, check_same_thread=False)
+        try:
+            stamp = db.execute(
+                "SELECT value FROM meta WHERE key = 'stamp'"
+            ).fetchone()
+        except sqlite3.DatabaseError:
+            stamp = None
+        if stamp and stamp[0] == self._stamp():
+            return db
+        db.close()
+        return None
+
+    def _connect(self):
+        """Open the index, building it if missing or outdated."""
+        if self._db:
+            return self._db
+
+        db = self._open_current()
+        if db is None:
+            with index_lock(self._path):
+                # it might have been built while waiting for the lock
+                db = self._open_current()
+                if db is None:
+                    self._build()
+                    db = sqlite3.connect(
+                        self._path, check_same_thread=False
+                    )
+        self._db = db
+        return db
+
+    def is_built(self):
+        """Checks if the index exists and is up to date."""
+        if self._db is None:
+            self._db = self._open_current()
+        return self._db is not None
+
+    def build(self):
+        """Scan the archive headers and write the index."""
+        with index_lock(self._path):
+            self._build()
+
+    def _build(self):
+        """Write the index, without locking it."""
+        compressed = is_gzip(self._archive)
+        if compressed and not is_bgzf(self._archive):
+            raise ValueError(
+                f"{self._archive} cannot be indexed, it must be uncompressed "
+                f"or BGZF compressed."
+            )
+
+        stamp = self._stamp()
+        tmp_path = temp_path(self._path)
+        try:
+            self._write(tmp_path, stamp, compressed)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _write(self, path, stamp, compressed):
+        """Write the index of the archive in a file."""
+        with closing(sqlite3.connect(path)) as db:
+            db.executescript("""
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE members (
+                    idx INTEGER PRIMARY KEY, name TEXT, offset INTEGER,
+                    size INTEGER
+                );
+                CREATE TABLE blocks (coffset INTEGER, uoffset INTEGER);
+            """)
+
+            opener = gzip.open if compressed else open
+            size = 0
+            with opener(self._archive, "rb") as f, \
+                    tarfile.open(fileobj=f, mode="r|") as archive:
+                for size, member in enumerate(archive, 1):
+                    if member.isfile():
+                        db.execute(
+                            "INSERT INTO members VALUES (?, ?, ?, ?)", (
+                                size, member.name, member.offset_data,
+                                member.size,
+                            )
+                        )
+                    # the headers are not needed once indexed
+                    archive.members = []
+
+            if compressed:
+                db.executemany(
+                    "INSERT INTO blocks VALUES (?, ?)",
+                    BGZFFile.scan(self._archive)
+                )
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("stamp", stamp),
+                ("compressed", "1" if compressed else ""),
+                ("size", str(size)),
+            ])
+            db.commit()
+
+    def _meta(self, key):
+        """Get a value of the index metadata."""
+        return self._connect().execute(
+            "SELECT value FROM meta WHERE key = ?", (key, )
+        ).fetchone()[0]
+
+    def size(self):
+        """Number of members of the archive, files or not."""
+        return int(self._meta("size"))
+
+    def members(self, start=0, stop=None):
+        """Iterates over the files after the `start`-th member.
+
+        :returns: tuples of member index, name, content offset and size.
+        """
+        query = "SELECT idx, name, offset, size FROM members WHERE idx > ?"
+        params = [start]
+        if stop is not None:
+            query += " AND idx <= ?"
+            params.append(stop)
+        yield from self._connect().execute(query + " ORDER BY idx", params)
+
+    def open(self):
+        """Open the archive for random access to the member contents.
+
+        :returns: a file with a thread safe `read(offset, size)`.
+        """
+        if not self._meta("compressed"):
+            return UncompressedFile(self._archive)
+        blocks = self._connect().execute(
+            "SELECT coffset, uoffset FROM blocks ORDER BY uoffset"
+        ).fetchall()
+        return BGZFFile(self._archive, blocks=blocks)
+
+    def close(self):
+        """Close the index file."""
+        if self._db:
+            self._db.close()
+            self._db = None
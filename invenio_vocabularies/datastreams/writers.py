@@ -8,19 +8,47 @@
 
 """Writers module."""
 
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import weakref
 from abc import ABC, abstractmethod
+from functools import partial
 from pathlib import Path
 
 import yaml
 from invenio_access.permissions import system_identity
+from invenio_db import db
 from invenio_pidstore.errors import PIDAlreadyExists
 from invenio_records_resources.proxies import current_service_registry
+from invenio_records_resources.services.uow import UnitOfWork
 from marshmallow import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 
-from .datastreams import StreamEntry
+from ..records.models import DataStreamEntryHash
+from .datastreams import StreamEntry, _error_messages, bind_app_context
 from .errors import WriterError
 
 
+def _flatten_messages(messages, path=""):
+    """Flatten nested marshmallow error messages to `path: message`."""
+    if isinstance(messages, dict):
+        return [
+            flat for key, value in messages.items()
+            for flat in _flatten_messages(
+                value, f"{path}.{key}" if path else str(key)
+            )
+        ]
+    if isinstance(messages, list):
+        return [
+            flat for message in messages
+            for flat in _flatten_messages(message, path)
+        ]
+    return [f"{path}: {messages}" if path else str(messages)]
+
+
 class BaseWriter(ABC):
     """Base writer."""
 
@@ -34,12 +62,86 @@ class BaseWriter(ABC):
         """
         pass
 
+    def validate(self, stream_entry, *args, **kwargs):
+        """Checks that an entry can be written, without writing it.
+
+        Writers with nothing to check accept all entries.
+
+        :returns: The StreamEntry. Raises WriterError if it is invalid.
+        """
+        return stream_entry
+
+    def write_many(self, stream_entries, *args, retry=None, **kwargs):
+        """Writes a batch of stream entries to the target output.
+
+        Writers able to persist several entries at once should override it,
+        by default the entries are written one by one. Errors are added to
+        the failing entries instead of being raised.
+
+        :param retry: a `RetryPolicy` for the entries failing with a
+                      transient error, retried one by one so the entries
+                      already written are not written again.
+        :returns: The list of StreamEntry objects.
+        """
+        for stream_entry in stream_entries:
+            try:
+                if retry:
+                    retry.call(self.write, stream_entry, *args, **kwargs)
+                else:
+                    self.write(stream_entry, *args, **kwargs)
+            except WriterError as err:
+                stream_entry.errors.extend(_error_messages(self, err))
+            except Exception as err:
+                if not retry or not retry.is_retryable(err):
+                    raise
+                stream_entry.errors.extend(_error_messages(self, err))
+
+        return stream_entries
+
+
+class AsyncBaseWriter(ABC):
+    """Base asynchronous writer."""
+
+    @abstractmethod
+    async def write(self, stream_entry, *args, **kwargs):
+        """Writes the input stream entry to the target output.
+
+        :returns: A StreamEntry. The result of writing the entry.
+                  Raises WriterException in case of errors.
+        """
+        pass
+
+
+class AsyncWriterAdapter(AsyncBaseWriter):
+    """Adapts a synchronous writer to the asynchronous interface.
+
+    Entries are written in the event loop executor, therefore several
+    entries can be written at the same time from different threads.
+    """
+
+    def __init__(self, writer, *args, **kwargs):
+        """Constructor.
+
+        :param writer: a synchronous writer instance.
+        """
+        self._writer = writer
+        super().__init__(*args, **kwargs)
+
+    async def write(self, stream_entry, *args, **kwargs):
+        """Writes the input stream entry with the synchronous writer."""
+        loop = asyncio.get_running_loop()
+        write = bind_app_context(
+            partial(self._writer.write, stream_entry, *args, **kwargs)
+        )
+        return await loop.run_in_executor(None, write)
+
 
 class ServiceWriter(BaseWriter):
     """Writes the entries to an RDM instance using a Service object."""
 
     def __init__(
-        self, service_or_name, identity, *args, update=False, **kwargs
+        self, service_or_name, identity, *args, update=False,
+        skip_unchanged=False, **kwargs
     ):
         """Constructor.
 
@@ -47,13 +149,24 @@ class ServiceWriter(BaseWriter):
                                 service registry.
         :param identity: access identity.
         :param update: if True it will update records if they exist.
+        :param skip_unchanged: if True, entries whose content hash matches
+                               the one of their last write are skipped and
+                               marked as filtered. Entries modified or
+                               deleted by other means than a data stream
+                               are not detected.
         """
         if isinstance(service_or_name, str):
+            self._hash_namespace = service_or_name
             service_or_name = current_service_registry.get(service_or_name)
+        else:
+            self._hash_namespace = service_or_name.__class__.__name__
 
         self._service = service_or_name
         self._identity = system_identity
         self._update = update
+        self._skip_unchanged = skip_unchanged
+        # entries whose write failed after the service might have committed
+        self._attempted = weakref.WeakSet()
 
         super().__init__(*args, **kwargs)
 
@@ -64,29 +177,144 @@ class ServiceWriter(BaseWriter):
     def _resolve(self, id_):
         return self._service.read(self._identity, id_)
 
-    def write(self, stream_entry, *args, **kwargs):
-        """Writes the input entry using a given service."""
+    def _uow_kwargs(self, uow):
+        """Service call arguments to run in a given unit of work."""
+        return {"uow": uow} if uow else {}
+
+    def _hash_id(self, entry):
+        """Get the id under which the content hash of an entry is stored."""
+        try:
+            id_ = self._entry_id(entry)
+        except KeyError:
+            return None
+        if isinstance(id_, tuple):
+            id_ = ":".join(id_)
+        return id_
+
+    def _hash(self, entry):
+        """Stable content hash of an entry."""
+        serialized = json.dumps(
+            entry, sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def write(self, stream_entry, *args, uow=None, **kwargs):
+        """Writes the input entry using a given service.
+
+        :param uow: unit of work to register the operations in. If not
+                    given, the service commits the entry on its own.
+        """
+        retried = stream_entry in self._attempted
+        try:
+            result = self._write_entry(stream_entry, uow=uow, retried=retried)
+        except WriterError:
+            self._attempted.discard(stream_entry)
+            raise
+        except Exception as err:
+            # the unit of work rolls back on its own, otherwise the session
+            # must be usable again to retry or write the next entries
+            if not uow:
+                if isinstance(err, SQLAlchemyError):
+                    db.session.rollback()
+                # e.g. committed, then failed to index
+                self._attempted.add(stream_entry)
+            raise
+        self._attempted.discard(stream_entry)
+        return result
+
+    def _write_entry(self, stream_entry, uow=None, retried=False):
+        """Writes an entry, unless unchanged since its last write."""
         entry = stream_entry.entry
+        hash_id = self._hash_id(entry) if self._skip_unchanged else None
+        if not hash_id:
+            return self._write(entry, uow=uow, retried=retried)
+
+        hash_ = self._hash(entry)
+        stored = DataStreamEntryHash.query.get((self._hash_namespace, hash_id))
+        if stored and stored.hash == hash_:
+            stream_entry.filtered = True
+            return stream_entry
+
+        result = self._write(entry, uow=uow, retried=retried)
+        # stored in the same transaction as the entry when using a uow
+        db.session.merge(DataStreamEntryHash(
+            namespace=self._hash_namespace, id=hash_id, hash=hash_
+        ))
+        if not uow:
+            db.session.commit()
+        return result
+
+    def validate(self, stream_entry, *args, **kwargs):
+        """Validates the entry with the service schema.
+
+        No PID is created, nothing is committed nor indexed. The errors are
+        given as `field.path: message` so they can be counted by field.
+        """
+        try:
+            self._service.schema.load(
+                stream_entry.entry, context={"identity": self._identity},
+                raise_errors=True,
+            )
+        except ValidationError as err:
+            raise WriterError(_flatten_messages(err.messages))
+        return stream_entry
+
+    def _write(self, entry, uow=None, retried=False):
+        """Create or update an entry.
+
+        :param retried: if True, a previous attempt failed after possibly
+                        creating the entry, which is then updated to
+                        complete the write, e.g. index it.
+        """
         try:
             try:
-                return StreamEntry(
-                    self._service.create(self._identity, entry)
-                )
+                return StreamEntry(self._service.create(
+                    self._identity, entry, **self._uow_kwargs(uow)
+                ))
             except PIDAlreadyExists:
-                if not self._update:
+                if not self._update and not retried:
                     raise WriterError(
                         [f"Vocabulary entry already exists: {entry}"]
                     )
                 vocab_id = self._entry_id(entry)
                 current = self._resolve(vocab_id)
                 updated = dict(current.to_dict(), **entry)
-                return StreamEntry(
-                    self._service.update(self._identity, vocab_id, updated)
-                )
+                return StreamEntry(self._service.update(
+                    self._identity, vocab_id, updated,
+                    **self._uow_kwargs(uow)
+                ))
 
         except ValidationError as err:
             raise WriterError([{"ValidationError": err.messages}])
 
+    def write_many(self, stream_entries, *args, retry=None, **kwargs):
+        """Writes the input entries in a single unit of work.
+
+        If any of the entries fails, or the batch fails with a transient
+        error, the whole batch is rolled back and written again entry by
+        entry, so errors are reported, and retries done, per entry.
+        """
+        committing = False
+        try:
+            with UnitOfWork(db.session) as uow:
+                for stream_entry in stream_entries:
+                    self.write(stream_entry, uow=uow)
+                committing = True
+                uow.commit()
+        except Exception as err:
+            if not isinstance(err, WriterError) \
+                    and not (retry and retry.is_retryable(err)):
+                raise
+            if committing:
+                # e.g. committed, then failed to index, the entries are
+                # completed by updating them
+                self._attempted.update(stream_entries)
+            return super().write_many(
+                stream_entries, *args, retry=retry, **kwargs
+            )
+
+        return stream_entries
+
 
 class YamlWriter(BaseWriter):
     """Writes the entries to a YAML file."""
@@ -108,3 +336,52 @@ class YamlWriter(BaseWriter):
             yaml.safe_dump([stream_entry.entry], file)
 
         return stream_entry
+
+    def write_many(self, stream_entries, *args, **kwargs):
+        """Writes the input stream entries opening the file only once."""
+        with open(self._filepath, 'a') as file:
+            yaml.safe_dump([se.entry for se in stream_entries], file)
+
+        return stream_entries
+
+
+class DeadLetterWriter(BaseWriter):
+    """Writes failed entries to a gzip compressed JSON lines file.
+
+    Each line holds the raw entry as it was read, the stage that failed and
+    the errors, so the entries can be replayed with a `DeadLetterReader`.
+    The raw entry is taken from the `raw` attribute the data stream sets,
+    falling back to the current entry. Bytes are base64 encoded.
+    """
+
+    def __init__(self, filepath, *args, **kwargs):
+        """Constructor.
+
+        :param filepath: path of the output file. Entries are appended.
+        """
+        self._filepath = Path(filepath)
+        self._file = None
+
+        super().__init__(*args, **kwargs)
+
+    def write(self, stream_entry, *args, stage=None, **kwargs):
+        """Appends the failed entry to the file."""
+        entry = getattr(stream_entry, "raw", stream_entry.entry)
+        line = {"stage": stage, "errors": stream_entry.errors}
+        if isinstance(entry, bytes):
+            line["entry"] = base64.b64encode(entry).decode("ascii")
+            line["encoding"] = "base64"
+        else:
+            line["entry"] = entry
+
+        if self._file is None:
+            self._file = gzip.open(self._filepath, "at", encoding="utf-8")
+        self._file.write(json.dumps(line, default=str) + "\n")
+
+        return stream_entry
+
+    def close(self):
+        """Closes the file, it is opened again on the next write."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -28,6 +28,7 @@ class VocabularyFixture:
             reader_config=config["reader"],
             transformers_config=config.get("transformers"),
             writers_config=config["writers"],
+            filters_config=config.get("filters"),
         )
 
         errors = []
@@ -8,6 +8,9 @@
 
 """Vocabulary models."""
 
+from datetime import datetime
+from uuid import uuid4
+
 from invenio_db import db
 from invenio_records.models import RecordMetadataBase
 
@@ -85,3 +88,115 @@ class VocabularyScheme(db.Model):
             obj = cls(**data)
             db.session.add(obj)
         return obj
+
+
+class DataStreamCheckpoint(db.Model):
+    """Data stream checkpoint model.
+
+    Stores the last reader position of a data stream run, so it can be
+    resumed if interrupted.
+    """
+
+    __tablename__ = "vocabularies_datastream_checkpoints"
+
+    id = db.Column(db.String, primary_key=True)
+    # JSON serialized reader position
+    position = db.Column(db.Text)
+    updated = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+        nullable=False
+    )
+
+
+class DataStreamEntryHash(db.Model):
+    """Data stream entry hash model.
+
+    Stores the content hash of the last written version of an entry, so
+    unchanged entries can be skipped on updates.
+    """
+
+    __tablename__ = "vocabularies_datastream_hashes"
+
+    # This is e.g. `names`, 'affiliations', ...
+    namespace = db.Column(db.String, primary_key=True)
+    id = db.Column(db.String, primary_key=True)
+    hash = db.Column(db.String(64), nullable=False)
+    updated = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+        nullable=False
+    )
+
+
+class DataStreamTask(db.Model):
+    """Data stream task model.
+
+    Stores the status and progress of a data stream processed by a task.
+    """
+
+    __tablename__ = "vocabularies_datastream_tasks"
+
+    id = db.Column(
+        db.String(36), primary_key=True, default=lambda: str(uuid4())
+    )
+    # One of `queued`, `running`, `completed` or `failed`
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    errored = db.Column(db.Integer, nullable=False, default=0)
+    filtered = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started = db.Column(db.DateTime)
+    updated = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow,
+        nullable=False
+    )
+    finished = db.Column(db.DateTime)
+
+    @classmethod
+    def create(cls):
+        """Create a new queued task."""
+        with db.session.begin_nested():
+            obj = cls()
+            db.session.add(obj)
+        return obj
+
+    @classmethod
+    def start(cls, id_):
+        """Mark a task as running, unless it already is."""
+        cls.query.filter_by(id=id_, status="queued").update(
+            {"status": "running", "started": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+    @classmethod
+    def increment(cls, id_, processed=0, errored=0, filtered=0):
+        """Add to the counters of a task.
+
+        The counters are incremented in the database, so several processes
+        can update the same task.
+        """
+        cls.query.filter_by(id=id_).update({
+            "processed": cls.processed + processed,
+            "errored": cls.errored + errored,
+            "filtered": cls.filtered + filtered,
+            "updated": datetime.utcnow(),
+        }, synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def finish(cls, id_, status="completed"):
+        """Mark a task as finished with a given status."""
+        cls.query.filter_by(id=id_).update(
+            {"status": status, "finished": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+    @property
+    def entries_per_second(self):
+        """Processing throughput since the task started."""
+        if not self.started:
+            return 0
+        end = self.finished or self.updated
+        elapsed = (end - self.started).total_seconds()
+        return self.processed / elapsed if elapsed > 0 else 0
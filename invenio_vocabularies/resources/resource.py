@@ -13,7 +13,7 @@ from functools import wraps
 import marshmallow as ma
 from flask import g
 from flask_resources import JSONSerializer, MarshmallowJSONSerializer, \
-    ResponseHandler, resource_requestctx, response_handler
+    ResponseHandler, request_parser, resource_requestctx, response_handler
 from invenio_records_resources.resources import RecordResource, \
     RecordResourceConfig, SearchRequestArgsSchema
 from invenio_records_resources.resources.records.headers import etag_headers
@@ -46,7 +46,8 @@ class VocabulariesResourceConfig(RecordResourceConfig):
     routes = {
         "list": "/<type>",
         "item": "/<type>/<pid_value>",
-        "tasks": "/tasks"
+        "tasks": "/tasks",
+        "task": "/tasks/<task_id>",
     }
 
     request_view_args = {
@@ -71,6 +72,11 @@ class VocabulariesResourceConfig(RecordResourceConfig):
     }
 
 
+request_task_view_args = request_parser(
+    {"task_id": ma.fields.Str(required=True)}, location="view_args"
+)
+
+
 #
 # Resource
 #
@@ -84,6 +90,9 @@ class VocabulariesResource(RecordResource):
         rules.append(
             route("POST", routes["tasks"], self.launch),
         )
+        rules.append(
+            route("GET", routes["task"], self.read_task),
+        )
         return rules
 
     @request_search_args
@@ -155,7 +164,19 @@ class VocabulariesResource(RecordResource):
         return "", 204
 
     @request_data
+    @response_handler()
     def launch(self):
         """Create a task."""
-        self.service.launch(g.identity, resource_requestctx.data or {})
-        return "", 202
+        task = self.service.launch(
+            g.identity, resource_requestctx.data or {}
+        )
+        return task, 202
+
+    @request_task_view_args
+    @response_handler()
+    def read_task(self):
+        """Read the status and progress of a task."""
+        task = self.service.read_task(
+            g.identity, resource_requestctx.view_args["task_id"]
+        )
+        return task, 200
@@ -43,6 +43,7 @@ class DatastreamObject(Schema):
 
     type = fields.Str(required=True)
     args = fields.Dict(keys=fields.Str(), values=fields.Field)
+    rate_limit = fields.Dict(keys=fields.Str(), values=fields.Field)
 
 
 class TaskSchema(Schema):
@@ -59,3 +60,14 @@ class TaskSchema(Schema):
         validate=validate.Length(min=1),
         required=True,
     )
+    batch_size = fields.Int(validate=validate.Range(min=1))
+    pipelined = fields.Bool()
+    concurrent_writers = fields.Bool()
+    write_retry = fields.Dict()
+    dry_run = fields.Bool()
+    checkpoint = fields.Nested(DatastreamObject)
+    checkpoint_key = fields.Str()
+    checkpoint_interval = fields.Int(validate=validate.Range(min=1))
+    dead_letter = fields.Nested(DatastreamObject)
+    filters = fields.List(fields.Nested(DatastreamObject))
+    partitions = fields.Int(validate=validate.Range(min=1))
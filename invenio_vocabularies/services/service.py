@@ -22,13 +22,16 @@ from invenio_records_resources.services.records.params import FilterParam, \
 from invenio_records_resources.services.records.schema import \
     ServiceSchemaWrapper
 from invenio_records_resources.services.uow import unit_of_work
+from marshmallow import ValidationError
 
+from ..datastreams.errors import DataStreamConfigError
+from ..datastreams.factories import DataStreamFactory
 from ..records.api import Vocabulary
-from ..records.models import VocabularyType
+from ..records.models import DataStreamTask, VocabularyType
 from .components import PIDComponent, VocabularyTypeComponent
 from .permissions import PermissionPolicy
 from .schema import TaskSchema, VocabularySchema
-from .tasks import process_datastream
+from .tasks import launch_partitioned_datastream, process_datastream
 
 
 class VocabularySearchOptions(SearchOptions):
@@ -219,7 +222,49 @@ class VocabulariesService(RecordService):
             context={"identity": identity},  # FIXME: is this needed
             raise_errors=True
         )
-        process_datastream.delay(task_config)
+        # fail before queuing the task if the components are misconfigured
+        try:
+            DataStreamFactory.validate(
+                reader_config=task_config["reader"],
+                writers_config=task_config["writers"],
+                transformers_config=task_config.get("transformers"),
+                checkpoint_config=task_config.get("checkpoint"),
+                dead_letter_config=task_config.get("dead_letter"),
+                filters_config=task_config.get("filters"),
+            )
+        except DataStreamConfigError as err:
+            raise ValidationError(err.errors)
+
+        task = DataStreamTask.create()
+        db.session.commit()
+        if task_config.get("partitions", 1) > 1:
+            launch_partitioned_datastream.delay(task_config, task_id=task.id)
+        else:
+            process_datastream.delay(task_config, task_id=task.id)
 
         # 202 if accepted, otherwise it will be caught by an error handler
-        return True
+        return self._dump_task(task)
+
+    def read_task(self, identity, id_):
+        """Read the status and progress of a task."""
+        self.require_permission(identity, "manage")
+        task = DataStreamTask.query.filter_by(id=id_).one()
+        return self._dump_task(task)
+
+    def _dump_task(self, task):
+        """Serialize a task."""
+        def isoformat(date):
+            return date.isoformat() if date else None
+
+        return {
+            "id": task.id,
+            "status": task.status,
+            "processed": task.processed,
+            "errored": task.errored,
+            "filtered": task.filtered,
+            "entries_per_second": round(task.entries_per_second, 2),
+            "created": isoformat(task.created),
+            "started": isoformat(task.started),
+            "updated": isoformat(task.updated),
+            "finished": isoformat(task.finished),
+        }
@@ -7,22 +7,157 @@
 
 """Celery tasks."""
 
-from celery import shared_task
+from time import monotonic
+
+from celery import chord, shared_task
 from flask import current_app
+from invenio_db import db
+
+from ..datastreams.factories import DataStreamFactory, ReaderFactory
+from ..datastreams.instrumentation import StatsCollector
+from ..records.models import DataStreamTask
+
+
+class _TaskProgress:
+    """Periodically adds the processed entries to the task counters."""
+
+    def __init__(self, task_id, interval):
+        """Constructor.
+
+        :param task_id: id of the `DataStreamTask`, if None nothing is saved.
+        :param interval: minimum number of seconds between updates.
+        """
+        self._task_id = task_id
+        self._interval = interval
+        self._last = monotonic()
+        self._pending = {"processed": 0, "errored": 0, "filtered": 0}
+
+    def update(self, outcome):
+        """Count a processed entry.
 
-from ..datastreams.factories import DataStreamFactory
+        :param outcome: one of `success`, `errored` or `filtered`.
+        """
+        self._pending["processed"] += 1
+        if outcome in self._pending:
+            self._pending[outcome] += 1
+        if monotonic() - self._last >= self._interval:
+            self.flush()
+
+    def flush(self):
+        """Save the pending counts."""
+        if self._task_id and self._pending["processed"]:
+            DataStreamTask.increment(self._task_id, **self._pending)
+        self._pending = {"processed": 0, "errored": 0, "filtered": 0}
+        self._last = monotonic()
+
+
+def _process(config, partition=None, task_id=None):
+    """Process a datastream from config.
+
+    :param task_id: id of the `DataStreamTask` to report progress to.
+    :returns: the number of succeeded, errored and filtered entries.
+    """
+    if task_id:
+        DataStreamTask.start(task_id)
+
+    stats = StatsCollector()
+    progress = _TaskProgress(
+        task_id, current_app.config["VOCABULARIES_TASKS_PROGRESS_INTERVAL"]
+    )
+    counts = {"success": 0, "errored": 0, "filtered": 0}
+    try:
+        ds = DataStreamFactory.create(
+            reader_config=config["reader"],
+            transformers_config=config.get("transformers"),
+            writers_config=config["writers"],
+            filters_config=config.get("filters"),
+            batch_size=config.get("batch_size"),
+            pipelined=config.get("pipelined", False),
+            concurrent_writers=config.get("concurrent_writers", False),
+            write_retry_config=config.get("write_retry"),
+            dry_run=config.get("dry_run", False),
+            checkpoint_config=config.get("checkpoint"),
+            checkpoint_key=config.get("checkpoint_key"),
+            checkpoint_interval=config.get("checkpoint_interval", 1000),
+            instrumentation=stats,
+            dead_letter_config=config.get("dead_letter"),
+            partition=partition,
+        )
+
+        for result in ds.process():
+            if result.errors:
+                for err in result.errors:
+                    current_app.logger.error(err)
+                outcome = "errored"
+            elif result.filtered:
+                outcome = "filtered"
+            else:
+                outcome = "success"
+            counts[outcome] += 1
+            progress.update(outcome)
+    except Exception:
+        # the session might be unusable after a failed write
+        db.session.rollback()
+        progress.flush()
+        if task_id:
+            DataStreamTask.finish(task_id, status="failed")
+        raise
+
+    progress.flush()
+    current_app.logger.info(f"Datastream stages timing:\n{stats.summary()}")
+    return counts
 
 
 @shared_task(ignore_result=True)
-def process_datastream(config):
+def process_datastream(config, task_id=None):
     """Process a datastream from config."""
-    ds = DataStreamFactory.create(
-        reader_config=config["reader"],
-        transformers_config=config.get("transformers"),
-        writers_config=config["writers"],
+    _process(config, task_id=task_id)
+    if task_id:
+        DataStreamTask.finish(task_id)
+
+
+@shared_task
+def process_datastream_partition(config, partition, task_id=None):
+    """Process a partition of a datastream from config.
+
+    :returns: the number of succeeded, errored and filtered entries.
+    """
+    return _process(config, partition=partition, task_id=task_id)
+
+
+@shared_task
+def aggregate_datastream_results(results, task_id=None):
+    """Sum up the results of all the partitions of a datastream."""
+    totals = {"success": 0, "errored": 0, "filtered": 0}
+    for counts in results:
+        for key, value in counts.items():
+            totals[key] += value
+
+    current_app.logger.info(
+        f"Datastream processed in {len(results)} partitions: "
+        f"{totals['success']} succeeded, {totals['errored']} errored, "
+        f"{totals['filtered']} filtered."
     )
+    if task_id:
+        DataStreamTask.finish(task_id)
+    return totals
+
+
+@shared_task(ignore_result=True)
+def launch_partitioned_datastream(config, task_id=None):
+    """Split a datastream in partitions processed by different tasks.
+
+    Needs a Celery result backend to aggregate the results of the tasks.
+    """
+    try:
+        reader = ReaderFactory.create(config["reader"])
+        partitions = reader.partitions(config["partitions"])
+    except Exception:
+        if task_id:
+            DataStreamTask.finish(task_id, status="failed")
+        raise
 
-    for result in ds.process():
-        if result.errors:
-            for err in result.errors:
-                current_app.logger.error(err)
+    chord(
+        process_datastream_partition.s(config, partition, task_id=task_id)
+        for partition in partitions
+    )(aggregate_datastream_results.s(task_id=task_id))
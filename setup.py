@@ -35,6 +35,18 @@ extras_require = {
     "elasticsearch7": [
         "invenio-search[elasticsearch7]{}".format(invenio_search_version),
     ],
+    # Rates and checkpoints kept in the Invenio cache
+    "cache": [
+        "invenio-cache>=1.1.0",
+    ],
+    # Faster decoding of JSON lines
+    "orjson": [
+        "orjson>=3.0.0",
+    ],
+    # Reading zstd compressed files
+    "zstd": [
+        "zstandard>=0.18.0",
+    ],
     # Databases
     "mysql": [
         "invenio-db[mysql,versioning]{}".format(invenio_db_version),
@@ -116,6 +128,34 @@ setup(
         'invenio_i18n.translations': [
             'invenio_vocabularies = invenio_vocabularies',
         ],
+        "invenio_vocabularies.datastream.readers": [
+            "composite = invenio_vocabularies.datastreams.readers:CompositeReader",  # noqa
+            "csv = invenio_vocabularies.datastreams.readers:CsvReader",
+            "dead-letter = invenio_vocabularies.datastreams.readers:DeadLetterReader",  # noqa
+            "jsonl = invenio_vocabularies.datastreams.readers:JsonLinesReader",  # noqa
+            "orcid-http = invenio_vocabularies.contrib.names.datastreams:OrcidHTTPReader",  # noqa
+            "tar = invenio_vocabularies.datastreams.readers:TarReader",
+            "tsv = invenio_vocabularies.datastreams.readers:TsvReader",
+            "yaml = invenio_vocabularies.datastreams.readers:YamlReader",
+        ],
+        "invenio_vocabularies.datastream.transformers": [
+            "orcid = invenio_vocabularies.contrib.names.datastreams:OrcidTransformer",  # noqa
+            "xml = invenio_vocabularies.datastreams.transformers:XMLTransformer",  # noqa
+        ],
+        "invenio_vocabularies.datastream.writers": [
+            "dead-letter = invenio_vocabularies.datastreams.writers:DeadLetterWriter",  # noqa
+            "names-service = invenio_vocabularies.contrib.names.datastreams:NamesServiceWriter",  # noqa
+            "service = invenio_vocabularies.datastreams.writers:ServiceWriter",
+            "yaml = invenio_vocabularies.datastreams.writers:YamlWriter",
+        ],
+        "invenio_vocabularies.datastream.checkpoint_stores": [
+            "cache = invenio_vocabularies.datastreams.checkpoints:CacheCheckpointStore",  # noqa
+            "db = invenio_vocabularies.datastreams.checkpoints:DBCheckpointStore",  # noqa
+            "file = invenio_vocabularies.datastreams.checkpoints:FileCheckpointStore",  # noqa
+        ],
+        "invenio_vocabularies.datastream.filters": [
+            "duplicate = invenio_vocabularies.datastreams.filters:DuplicateFilter",  # noqa
+        ],
     },
     extras_require=extras_require,
     install_requires=install_requires,
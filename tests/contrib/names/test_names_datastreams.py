@@ -20,7 +20,8 @@ from invenio_vocabularies.contrib.names.datastreams import \
 from invenio_vocabularies.contrib.names.services import NamesService, \
     NamesServiceConfig
 from invenio_vocabularies.datastreams import StreamEntry
-from invenio_vocabularies.datastreams.errors import WriterError
+from invenio_vocabularies.datastreams.errors import RetryableError, WriterError
+from invenio_vocabularies.datastreams.retry import RetryPolicy
 
 
 @pytest.fixture(scope='module')
@@ -167,7 +168,7 @@ class MockResponse():
     status_code = 200
 
 
-@patch('requests.get', side_effect=lambda url, headers: MockResponse())
+@patch('requests.Session.get', side_effect=lambda url, **kw: MockResponse())
 def test_orcid_http_reader(_, bytes_xml_entry):
     reader = OrcidHTTPReader(id="0000-0001-8135-3489")
     results = []
@@ -198,6 +199,41 @@ def test_names_service_writer_duplicate(app, es_clear, name_full_data):
     assert expected_error in err.value.args
 
 
+def test_names_service_writer_retry_created(
+    app, es_clear, name_full_data, names_service
+):
+    create = names_service.create
+    attempts = []
+
+    def create_then_fail(*args, **kwargs):
+        """Creates the entry, failing afterwards the first time."""
+        result = create(*args, **kwargs)
+        Name.index.refresh()  # refresh index to make changes live
+        attempts.append(result)
+        if len(attempts) == 1:
+            raise RetryableError("Indexing failed.")
+        return result
+
+    writer = NamesServiceWriter(names_service, system_identity)
+    stream_entry = StreamEntry(name_full_data)
+    with patch.object(names_service, "create", side_effect=create_then_fail):
+        RetryPolicy(sleep=lambda s: None).call(writer.write, stream_entry)
+
+    # the retry updated the entry created by the failed attempt
+    assert len(attempts) == 1
+    assert not stream_entry.errors
+    orcid = name_full_data["identifiers"][0]["identifier"]
+    Name.index.refresh()
+    results = names_service.search(
+        system_identity, q=f"identifiers.identifier:{orcid}"
+    )
+    assert results.total == 1
+
+    # other entries with the same ORCiD are still duplicates
+    with pytest.raises(WriterError):
+        writer.write(stream_entry=StreamEntry(name_full_data))
+
+
 def test_names_service_writer_update_existing(
     app, es_clear, name_full_data, names_service
 ):
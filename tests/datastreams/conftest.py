@@ -15,8 +15,8 @@ fixtures are available.
 import pytest
 
 from invenio_vocabularies.datastreams import StreamEntry
-from invenio_vocabularies.datastreams.errors import TransformerError, \
-    WriterError
+from invenio_vocabularies.datastreams.errors import RetryableError, \
+    TransformerError, WriterError
 from invenio_vocabularies.datastreams.readers import BaseReader
 from invenio_vocabularies.datastreams.transformers import BaseTransformer
 from invenio_vocabularies.datastreams.writers import BaseWriter
@@ -25,6 +25,20 @@ from invenio_vocabularies.datastreams.writers import BaseWriter
 class TestReader(BaseReader):
     """Test reader."""
 
+    def read(self, position=None, *args, **kwargs):
+        """Yields the values in the origin."""
+        start = position or 0
+        for idx, value in enumerate(self._origin[start:], start + 1):
+            yield StreamEntry(value, position=idx)
+
+    def count(self, position=None, *args, **kwargs):
+        """Counts the values in the origin."""
+        return len(self._origin) - (position or 0)
+
+
+class UnpositionedTestReader(BaseReader):
+    """Test reader yielding entries without position."""
+
     def read(self, *args, **kwargs):
         """Yields the values in the origin."""
         for value in self._origin:
@@ -65,11 +79,49 @@ class FailingTestWriter(BaseWriter):
             raise WriterError(f"{self.fail_on} value found.")
 
 
+class FlakyTestWriter(BaseWriter):
+    """Test writer failing the first write of some values."""
+
+    def __init__(self, fail_on=None, written=None):
+        """Constructor.
+
+        :param fail_on: the value failing once, by default all of them.
+        :param written: a list to append the written values to.
+        """
+        super().__init__()
+        self.fail_on = fail_on
+        self.written = written if written is not None else []
+        self._failed = set()
+
+    def write(self, stream_entry, *args, **kwargs):
+        """Fails the first time, appends the value afterwards."""
+        value = stream_entry.entry
+        if self.fail_on in (None, value) and value not in self._failed:
+            self._failed.add(value)
+            raise RetryableError("Try again.")
+        self.written.append(value)
+
+
+class ValidatingTestWriter(BaseWriter):
+    """Test writer only validating, values lower than 1 are invalid."""
+
+    def write(self, stream_entry, *args, **kwargs):
+        """Entries must not be written."""
+        raise AssertionError("Entries must not be written.")
+
+    def validate(self, stream_entry, *args, **kwargs):
+        """Fails with two messages on invalid values."""
+        if stream_entry.entry < 1:
+            raise WriterError(["value: Must be positive.", "id: Missing."])
+        return stream_entry
+
+
 @pytest.fixture(scope='module')
 def app_config(app_config):
     """Mimic an instance's configuration."""
     app_config["VOCABULARIES_DATASTREAM_READERS"] = {
-        "test": TestReader
+        "test": TestReader,
+        "unpositioned": UnpositionedTestReader,
     }
     app_config["VOCABULARIES_DATASTREAM_TRANSFORMERS"] = {
         "test": TestTransformer
@@ -77,6 +129,8 @@ def app_config(app_config):
     app_config["VOCABULARIES_DATASTREAM_WRITERS"] = {
         "test": TestWriter,
         "fail": FailingTestWriter,
+        "flaky": FlakyTestWriter,
+        "validating": ValidatingTestWriter,
     }
 
     return app_config
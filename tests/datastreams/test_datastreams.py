@@ -8,11 +8,20 @@
 
 """DataStreams tests."""
 
+import asyncio
 from pathlib import Path
 
 import pytest
 
-from invenio_vocabularies.datastreams.factories import DataStreamFactory
+from invenio_vocabularies.datastreams import AsyncDataStream
+from invenio_vocabularies.datastreams.checkpoints import FileCheckpointStore
+from invenio_vocabularies.datastreams.errors import DataStreamConfigError
+from invenio_vocabularies.datastreams.factories import DataStreamFactory, \
+    ReaderFactory, TransformerFactory, WriterFactory
+from invenio_vocabularies.datastreams.instrumentation import StatsCollector
+from invenio_vocabularies.datastreams.readers import DeadLetterReader, \
+    YamlReader
+from invenio_vocabularies.datastreams.writers import DeadLetterWriter
 
 
 @pytest.fixture(scope="module")
@@ -73,3 +82,395 @@ def test_base_datastream_fail_on_write(app, vocabulary_config):
     invalid_tr = next(stream_iter)
     assert invalid_tr.entry == -1
     assert "TestTransformer: Value cannot be negative" in invalid_tr.errors
+
+
+def test_datastream_total(app, vocabulary_config):
+    datastream = DataStreamFactory.create(
+        reader_config=vocabulary_config["reader"],
+        transformers_config=vocabulary_config.get("transformers"),
+        writers_config=vocabulary_config["writers"],
+    )
+
+    assert datastream.total() == 2
+
+
+def test_datastream_filters(app):
+    datastream = DataStreamFactory.create(
+        reader_config={
+            "type": "test",
+            "args": {"origin": [{"id": "a"}, {"id": "b"}, {"id": "a"}]},
+        },
+        writers_config=[{"type": "test"}],
+        filters_config=[{"type": "duplicate", "args": {"id_path": "id"}}],
+    )
+
+    results = list(datastream.process())
+    assert [result.filtered for result in results] == [False, False, True]
+
+
+def test_datastream_partitions(app):
+    reader_config = {"type": "test", "args": {"origin": [1, 2, 3, 4, 5]}}
+    reader = ReaderFactory.create(reader_config)
+    partitions = reader.partitions(2)
+    assert partitions == [(0, 2), (2, 5)]
+
+    entries = []
+    for partition in partitions:
+        datastream = DataStreamFactory.create(
+            reader_config=reader_config,
+            transformers_config=[{"type": "test"}],
+            writers_config=[{"type": "test"}],
+            partition=partition,
+        )
+        assert datastream.total() == partition[1] - partition[0]
+        entries.append([result.entry for result in datastream.process()])
+
+    assert entries == [[2, 3], [4, 5, 6]]
+
+
+def test_datastream_partition_without_positions(app):
+    datastream = DataStreamFactory.create(
+        reader_config={
+            "type": "unpositioned", "args": {"origin": [1, 2, 3]}
+        },
+        writers_config=[{"type": "test"}],
+        partition=(0, 1),
+    )
+
+    # the end of the partition cannot be found
+    with pytest.raises(ValueError):
+        list(datastream.process())
+
+
+def test_batch_datastream(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "fail", "args": {"fail_on": 3}}],
+        batch_size=2,
+    )
+
+    results = list(datastream.process())
+    # transformer errors are yielded before the batch is written
+    assert [result.entry for result in results] == [-1, 2, 3]
+    assert "TestTransformer: Value cannot be negative" in results[0].errors
+    assert not results[1].errors
+    assert results[2].errors == ["FailingTestWriter: 3 value found."]
+
+
+def test_datastream_transform_workers(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "test"}],
+        transform_workers=2,
+        transform_chunk_size=1,
+    )
+
+    results = list(datastream.process())
+    assert [result.entry for result in results] == [2, -1, 3]
+    assert "TestTransformer: Value cannot be negative" in results[1].errors
+
+
+def test_pipelined_datastream(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "fail", "args": {"fail_on": 3}}],
+        pipelined=True,
+        queue_size=1,
+    )
+
+    results = list(datastream.process())
+    assert [result.entry for result in results] == [2, -1, 3]
+    assert "TestTransformer: Value cannot be negative" in results[1].errors
+    assert results[2].errors == ["FailingTestWriter: 3 value found."]
+
+
+def test_pipelined_datastream_reader_error(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": 1}},  # not iterable
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "test"}],
+        pipelined=True,
+    )
+
+    with pytest.raises(TypeError):
+        list(datastream.process())
+
+
+def test_async_datastream(app):
+    datastream = AsyncDataStream(
+        reader=ReaderFactory.create(
+            {"type": "test", "args": {"origin": [1, -1, 2]}}
+        ),
+        transformers=[TransformerFactory.create({"type": "test"})],
+        writers=[
+            WriterFactory.create({"type": "fail", "args": {"fail_on": 3}})
+        ],
+        concurrency=2,
+    )
+
+    async def process():
+        return [result async for result in datastream.process()]
+
+    results = asyncio.run(process())
+    assert [result.entry for result in results] == [2, -1, 3]
+    assert "TestTransformer: Value cannot be negative" in results[1].errors
+    assert results[2].errors == ["FailingTestWriter: 3 value found."]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"batch_size": 10},
+    {"transform_workers": 2},
+    {"checkpoint_config": {"type": "file", "args": {"filepath": "cp.json"}}},
+    {"dead_letter_config": {
+        "type": "dead-letter", "args": {"filepath": "failed.jsonl.gz"}
+    }},
+    {"partition": (1, 2)},
+    {"concurrent_writers": True},
+    {"write_retry_config": {"max_attempts": 2}},
+])
+def test_async_datastream_unsupported(app, kwargs):
+    with pytest.raises(ValueError):
+        DataStreamFactory.create(
+            reader_config={"type": "test", "args": {"origin": [1, 2, 3]}},
+            writers_config=[{"type": "test"}],
+            asynchronous=True,
+            **kwargs
+        )
+
+
+def test_async_datastream_dry_run(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        writers_config=[{"type": "validating"}],
+        asynchronous=True,
+        dry_run=True,
+    )
+
+    async def process():
+        return [result.errors async for result in datastream.process()]
+
+    assert asyncio.run(process()) == [
+        [],
+        [
+            "ValidatingTestWriter: value: Must be positive.",
+            "ValidatingTestWriter: id: Missing.",
+        ],
+        [],
+    ]
+
+
+def test_async_datastream_factory(app):
+    config = dict(
+        reader_config={"type": "test", "args": {"origin": [1, 2, 3]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "test"}],
+    )
+    datastream = DataStreamFactory.create(asynchronous=True, **config)
+    assert isinstance(datastream, AsyncDataStream)
+
+    async def process():
+        return [result.entry async for result in datastream.process()]
+
+    assert asyncio.run(process()) == [2, 3, 4]
+
+    with pytest.raises(ValueError):
+        DataStreamFactory.create(pipelined=True, asynchronous=True, **config)
+
+
+def test_datastream_checkpoint(app, tmp_path):
+    store = FileCheckpointStore(tmp_path / "checkpoints.json")
+    config = dict(
+        reader_config={"type": "test", "args": {"origin": [1, 2, 3]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "test"}],
+        checkpoint_config={
+            "type": "file",
+            "args": {"filepath": tmp_path / "checkpoints.json"}
+        },
+        checkpoint_key="test",
+        checkpoint_interval=1,
+    )
+
+    stream_iter = DataStreamFactory.create(**config).process()
+    assert next(stream_iter).entry == 2
+    assert next(stream_iter).entry == 3
+    stream_iter.close()  # interrupted run
+    assert store.load("test") == 1
+
+    # resumes after the first entry, and clears the checkpoint at the end
+    results = list(DataStreamFactory.create(**config).process())
+    assert [result.entry for result in results] == [3, 4]
+    assert store.load("test") is None
+
+
+def test_datastream_checkpoint_batches(app, tmp_path):
+    store = FileCheckpointStore(tmp_path / "checkpoints.json")
+    datastream = DataStreamFactory.create(
+        reader_config={
+            "type": "test", "args": {"origin": list(range(1, 101))}
+        },
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "test"}],
+        checkpoint_config={
+            "type": "file",
+            "args": {"filepath": tmp_path / "checkpoints.json"}
+        },
+        checkpoint_key="test",
+        checkpoint_interval=20,
+        batch_size=10,
+    )
+
+    stream_iter = datastream.process()
+    for _ in range(45):
+        next(stream_iter)
+    stream_iter.close()  # interrupted in the middle of a batch
+    # the last checkpoint is after the last full batch
+    assert store.load("test") == 40
+
+
+def test_datastream_instrumentation(app, vocabulary_config):
+    stats = StatsCollector()
+    datastream = DataStreamFactory.create(
+        reader_config=vocabulary_config["reader"],
+        transformers_config=vocabulary_config.get("transformers"),
+        writers_config=[{"type": "test"}],
+        instrumentation=stats,
+    )
+    list(datastream.process())
+
+    assert stats.histograms[("read", "TestReader")].entries == 2
+    assert stats.histograms[("transform", "TestTransformer")].entries == 2
+    # the negative value fails on the transformer and is not written
+    assert stats.histograms[("write", "TestWriter")].entries == 1
+    assert "TestTransformer" in stats.summary()
+
+
+def test_datastream_dead_letter(app, tmp_path):
+    filepath = tmp_path / "failed.jsonl.gz"
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[{"type": "fail", "args": {"fail_on": 3}}],
+        dead_letter=DeadLetterWriter(filepath),
+    )
+    list(datastream.process())
+
+    # raw entries are stored, i.e. before being transformed
+    failed = list(DeadLetterReader(filepath).read())
+    assert [stream_entry.entry for stream_entry in failed] == [-1, 2]
+
+    failed = list(DeadLetterReader(filepath, stages=["write"]).read())
+    assert [stream_entry.entry for stream_entry in failed] == [2]
+
+
+def test_datastream_invalid_config(app):
+    with pytest.raises(DataStreamConfigError) as err:
+        DataStreamFactory.create(
+            reader_config={"type": "test"},
+            transformers_config=[{"type": "test"}, {"type": "unknown"}],
+            writers_config=[{"type": "fail"}],
+        )
+
+    assert err.value.errors == [
+        "Reader test invalid arguments: missing a required argument: "
+        "'origin'",
+        "Writer fail invalid arguments: missing a required argument: "
+        "'fail_on'",
+        "Transformer unknown not configured.",
+    ]
+
+
+def test_datastream_lazy_config(app, monkeypatch):
+    readers = dict(
+        app.config["VOCABULARIES_DATASTREAM_READERS"],
+        lazy="invenio_vocabularies.datastreams.readers:YamlReader",
+    )
+    monkeypatch.setitem(
+        app.config, "VOCABULARIES_DATASTREAM_READERS", readers
+    )
+
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "lazy", "args": {"origin": "test.yaml"}},
+        writers_config=[{"type": "test"}],
+    )
+    assert isinstance(datastream._reader, YamlReader)
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_datastream_concurrent_writers(app, batch_size):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, 2, 3]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[
+            {"type": "test"},
+            {"type": "fail", "args": {"fail_on": 3}},
+        ],
+        batch_size=batch_size,
+        concurrent_writers=True,
+    )
+
+    results = {result.entry: result for result in datastream.process()}
+    assert not results[2].errors
+    assert results[3].errors == ["FailingTestWriter: 3 value found."]
+    assert not results[4].errors
+
+
+def test_datastream_write_retry(app):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, 2]}},
+        writers_config=[{"type": "flaky"}],
+        write_retry_config={"max_attempts": 2, "sleep": lambda s: None},
+    )
+    assert all(not result.errors for result in datastream.process())
+
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, 2]}},
+        writers_config=[{"type": "flaky"}],
+        write_retry_config={"max_attempts": 1},
+    )
+    for result in datastream.process():
+        assert result.errors == ["FlakyTestWriter: Try again."]
+
+
+def test_datastream_write_retry_batch(app):
+    written = []
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, 2, 3]}},
+        transformers_config=[{"type": "test"}],
+        writers_config=[
+            {"type": "flaky", "args": {"fail_on": 3, "written": written}}
+        ],
+        write_retry_config={"max_attempts": 2, "sleep": lambda s: None},
+        batch_size=3,
+    )
+
+    assert all(not result.errors for result in datastream.process())
+    # only the failed entry is written again, not the whole batch
+    assert written == [2, 3, 4]
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_datastream_dry_run(app, tmp_path, batch_size):
+    datastream = DataStreamFactory.create(
+        reader_config={"type": "test", "args": {"origin": [1, -1, 2]}},
+        writers_config=[{"type": "validating"}],
+        checkpoint_config={
+            "type": "file", "args": {"filepath": tmp_path / "cp.json"}
+        },
+        checkpoint_interval=1,
+        batch_size=batch_size,
+        dry_run=True,
+    )
+    results = list(datastream.process())
+    assert [result.errors for result in results] == [
+        [],
+        [
+            "ValidatingTestWriter: value: Must be positive.",
+            "ValidatingTestWriter: id: Missing.",
+        ],
+        [],
+    ]
+    assert not (tmp_path / "cp.json").exists()
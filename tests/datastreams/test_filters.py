@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Data Streams filters tests."""
+
+import pytest
+
+from invenio_vocabularies.datastreams import StreamEntry
+from invenio_vocabularies.datastreams.filters import DuplicateFilter
+
+
+@pytest.mark.parametrize("max_in_memory", [1000, 2])
+def test_duplicate_filter(max_in_memory):
+    entries = [
+        {"identifiers": [{"identifier": "0000-0001"}]},
+        {"identifiers": [{"identifier": "0000-0002"}]},
+        {"identifiers": [{"identifier": "0000-0001"}]},
+        {"identifiers": []},
+        {"identifiers": [{"identifier": "0000-0003"}]},
+        {"identifiers": [{"identifier": "0000-0002"}]},
+        {"identifiers": [{"identifier": "0000-0003"}]},
+    ]
+    filter_ = DuplicateFilter(
+        "identifiers.0.identifier", max_in_memory=max_in_memory
+    )
+
+    filtered = [filter_.filter(StreamEntry(entry)) for entry in entries]
+    assert filtered == [False, False, True, False, False, True, True]
+
+    # closing the filter forgets the seen ids
+    filter_.close()
+    assert not filter_.filter(StreamEntry(entries[0]))
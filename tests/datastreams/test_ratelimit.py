@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Data Streams rate limiting tests."""
+
+import pytest
+
+from invenio_vocabularies.datastreams import StreamEntry
+from invenio_vocabularies.datastreams.errors import DataStreamConfigError
+from invenio_vocabularies.datastreams.factories import DataStreamFactory
+from invenio_vocabularies.datastreams.ratelimit import RateLimiter
+
+
+class FakeClock:
+    """Clock advanced by sleeping."""
+
+    def __init__(self):
+        """Constructor."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the time."""
+        self.now += seconds
+
+
+def test_rate_limiter():
+    clock = FakeClock()
+    limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+
+    # the first second worth of entries goes through without waiting
+    for _ in range(10):
+        assert limiter.acquire() == 0
+    for _ in range(20):
+        limiter.acquire()
+    assert clock.now == pytest.approx(2)
+
+    # unused tokens are refilled up to the burst
+    clock.now += 60
+    for _ in range(10):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(0.1)
+
+
+def test_rate_limiter_bytes():
+    clock = FakeClock()
+    limiter = RateLimiter(100, unit="bytes", clock=clock, sleep=clock.sleep)
+
+    assert limiter.cost([
+        StreamEntry(b"x" * 10), StreamEntry("x" * 10), StreamEntry({"a": 1})
+    ]) == 28
+    for _ in range(4):
+        limiter.acquire_for([StreamEntry(b"x" * 100)])
+    assert clock.now == pytest.approx(3)
+
+    with pytest.raises(ValueError):
+        RateLimiter(100, unit="lines")
+
+
+def test_rate_limiter_cache(app, cache):
+    clock = FakeClock()
+    limiter = RateLimiter(
+        1, cache_key="import-rate", refresh=5, clock=clock,
+        sleep=clock.sleep
+    )
+    limiter.acquire()
+    assert limiter.rate == 1
+
+    cache.set("import-rate", 1000)
+    limiter.acquire()
+    # the cache is not read again until the refresh
+    assert limiter.rate == 1
+
+    clock.now += 5
+    limiter.acquire()
+    assert limiter.rate == 1000
+
+    cache.delete("import-rate")
+    clock.now += 5
+    limiter.acquire()
+    assert limiter.rate == 1
+
+
+def test_datastream_rate_limit(app):
+    datastream = DataStreamFactory.create(
+        reader_config={
+            "type": "test",
+            "args": {"origin": [1, 2]},
+            "rate_limit": {"rate": 100},
+        },
+        writers_config=[
+            {"type": "test"},
+            {"type": "test", "rate_limit": {"rate": 10, "unit": "bytes"}},
+        ],
+    )
+    assert datastream._read_rate_limit.rate == 100
+    assert datastream._write_rate_limits[0] is None
+    assert len([result for result in datastream.process()]) == 2
+
+    with pytest.raises(DataStreamConfigError) as err:
+        DataStreamFactory.create(
+            reader_config={
+                "type": "test",
+                "args": {"origin": [1, 2]},
+                "rate_limit": {"rate": 100, "unit": "lines"},
+            },
+            writers_config=[
+                {"type": "test", "rate_limit": {"per_second": 10}},
+            ],
+        )
+    assert len(err.value.errors) == 2
@@ -8,13 +8,33 @@
 
 """Data Streams readers tests."""
 
+import asyncio
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import struct
 import tarfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import yaml
 
-from invenio_vocabularies.datastreams.readers import TarReader, YamlReader
+from invenio_vocabularies.datastreams import StreamEntry
+from invenio_vocabularies.datastreams.compression import detect_compression, \
+    open_file
+from invenio_vocabularies.datastreams.errors import ReaderError
+from invenio_vocabularies.datastreams.httpcache import HTTPCache
+from invenio_vocabularies.datastreams.readers import AsyncReaderAdapter, \
+    BaseReader, CompositeReader, CsvReader, DeadLetterReader, \
+    JsonLinesReader, SimpleHTTPReader, TarReader, TsvReader, YamlReader
+from invenio_vocabularies.datastreams.tarindex import TarIndex
+from invenio_vocabularies.datastreams.writers import DeadLetterWriter
 
 
 @pytest.fixture(scope='module')
@@ -50,6 +70,45 @@ def test_yaml_reader(yaml_file, expected_from_yaml):
         assert stream_entry.entry == expected_from_yaml[idx]
 
 
+def test_yaml_reader_count(yaml_file, expected_from_yaml):
+    reader = YamlReader(yaml_file)
+
+    assert reader.count() == len(expected_from_yaml)
+    assert reader.count(position=1) == len(expected_from_yaml) - 1
+
+
+def test_yaml_reader_streaming(tmp_path):
+    filepath = tmp_path / "entries.yaml"
+    filepath.write_text(
+        "- id: a\n"
+        "  props: &props {k: [1, {v: x}]}\n"
+        "- [1, 2]\n"
+        "- id: c\n"
+        "  props: *props\n"
+    )
+    reader = YamlReader(filepath)
+
+    assert [e.entry for e in reader.read()] == yaml.safe_load(
+        filepath.read_text()
+    )
+    assert reader.count() == 3
+    # anchors of the skipped elements can still be referenced
+    entries = list(reader.read(position=2))
+    assert entries[0].entry == {"id": "c", "props": {"k": [1, {"v": "x"}]}}
+    assert entries[0].position == 3
+
+
+def test_yaml_reader_not_sequence(tmp_path):
+    filepath = tmp_path / "entries.yaml"
+    filepath.write_text("")
+    assert list(YamlReader(filepath).read()) == []
+    assert YamlReader(filepath).count() == 0
+
+    filepath.write_text("id: a\n")
+    with pytest.raises(ReaderError):
+        list(YamlReader(filepath).read())
+
+
 @pytest.fixture(scope='module')
 def expected_from_tar():
     return {
@@ -90,3 +149,569 @@ def test_tar_reader(tar_file, expected_from_tar):
         total += 1
 
     assert total == 2  # ignored the `.other` file
+
+
+def test_tar_reader_count(tar_file):
+    reader = TarReader(tar_file, regex=".yaml$")
+
+    assert reader.count() == 2  # ignored the `.other` file
+
+
+def test_tar_reader_resume(tar_file, expected_from_tar):
+    reader = TarReader(tar_file, regex=".yaml$")
+    first = next(reader.read())
+
+    entries = list(reader.read(position=first.position))
+    assert len(entries) == 1  # skipped the first yaml file
+    assert yaml.safe_load(entries[0].entry) == expected_from_tar
+
+
+def test_tar_reader_partitions(tar_file, tmp_path):
+    # compressed archives would be decompressed up to each partition
+    with pytest.raises(NotImplementedError):
+        TarReader(tar_file, regex=".yaml$").partitions(2)
+
+    filepath = tmp_path / "archive.tar"
+    filepath.write_bytes(gzip.decompress(tar_file.read_bytes()))
+    reader = TarReader(filepath, regex=".yaml$")
+
+    # the archive has three members
+    assert reader.partitions(2) == [(0, 1), (1, 3)]
+    assert reader.partitions(5) == [(0, 1), (1, 2), (2, 3)]
+
+
+def _bgzip(data, block_size=1000):
+    """Compress in BGZF blocks, like `bgzip`."""
+    blocks = []
+    for idx in range(0, len(data), block_size):
+        chunk = data[idx:idx + block_size]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        cdata = compressor.compress(chunk) + compressor.flush()
+        blocks.append(
+            b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff"
+            + struct.pack("<HBBHH", 6, 66, 67, 2, len(cdata) + 25)
+            + cdata
+            + struct.pack("<II", zlib.crc32(chunk), len(chunk))
+        )
+    return b"".join(blocks)
+
+
+@pytest.mark.parametrize("compression", [None, "bgzf"])
+@pytest.mark.parametrize("workers", [None, 2])
+def test_tar_reader_index(tmp_path, compression, workers):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for idx in range(20):
+            content = f"<record>{idx}</record>".encode() * idx
+            info = tarfile.TarInfo(f"{idx:02}.xml" if idx % 2 else f"{idx}")
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    filepath = tmp_path / "archive.tar"
+    data = buffer.getvalue()
+    if compression:
+        filepath = tmp_path / "archive.tar.gz"
+        data = _bgzip(data)
+    filepath.write_bytes(data)
+
+    expected = [
+        (stream_entry.entry, stream_entry.position) for stream_entry in
+        TarReader(filepath, mode="r:*", regex=".xml$").read()
+    ]
+    reader = TarReader(filepath, regex=".xml$", index=True, workers=workers)
+    entries = [
+        (stream_entry.entry, stream_entry.position)
+        for stream_entry in reader.read()
+    ]
+    assert entries == expected
+    assert (tmp_path / f"{filepath.name}.idx").exists()
+
+    assert reader.count() == 10
+    assert [e.position for e in reader.read(position=14)] == [16, 18, 20]
+    assert reader.partitions(2) == [(0, 10), (10, 20)]
+
+
+def test_tar_index_concurrent_build(tmp_path):
+    filepath = tmp_path / "archive.tar"
+    with tarfile.open(filepath, mode="w") as tar:
+        for idx in range(100):
+            info = tarfile.TarInfo(f"{idx}.xml")
+            tar.addfile(info, io.BytesIO())
+
+    def members(_):
+        index = TarIndex(filepath)
+        try:
+            return list(index.members())
+        finally:
+            index.close()
+
+    # the first build is waited for by the others, not overwritten
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(members, range(8)))
+    assert len(results[0]) == 100
+    assert all(result == results[0] for result in results)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_tar_reader_index_not_seekable(tar_file):
+    reader = TarReader(tar_file, index=True, index_path=f"{tar_file}.idx")
+
+    # a gzip compressed tar can only be read from the start
+    with pytest.raises(ValueError):
+        list(reader.read())
+
+
+@pytest.mark.parametrize("index", [False, True])
+def test_jsonl_reader(tmp_path, index):
+    filepath = tmp_path / "entries.jsonl"
+    filepath.write_text(
+        '{"id": "a"}\n'
+        '\n'
+        '{"id": "b", "title": {"en": "B"}}\n'
+        '{"id": \n'
+        '{"id": "d"}'
+    )
+    reader = JsonLinesReader(filepath, index=index)
+
+    entries = list(reader.read())
+    assert [e.entry for e in entries[:2]] == [
+        {"id": "a"}, {"id": "b", "title": {"en": "B"}}
+    ]
+    assert entries[2].errors
+    assert entries[3].entry == {"id": "d"}
+    assert reader.count() == 4
+
+    # positions are the offsets of the next lines
+    position = entries[1].position
+    assert [e.entry for e in reader.read(position=position)][1:] == [
+        {"id": "d"}
+    ]
+    assert reader.count(position=position) == 2
+
+    partitions = reader.partitions(2)
+    assert len(partitions) == 2
+    assert partitions[0][0] == 0
+    assert partitions[-1][1] == filepath.stat().st_size
+    assert (tmp_path / "entries.jsonl.idx").exists() == index
+
+
+def test_jsonl_reader_index_outdated(tmp_path):
+    filepath = tmp_path / "entries.jsonl"
+    filepath.write_text('{"id": "a"}\n')
+    reader = JsonLinesReader(filepath, index=True)
+    assert reader.count() == 1
+
+    with open(filepath, "a") as f:
+        f.write('{"id": "b"}\n{"id": "c"}\n')
+    assert reader.count() == 3
+    assert reader.partitions(3) == [(0, 12), (12, 24), (24, 36)]
+
+
+def test_jsonl_reader_index_concurrent_build(tmp_path):
+    filepath = tmp_path / "entries.jsonl"
+    filepath.write_text("".join(f'{{"id": {idx}}}\n' for idx in range(1000)))
+
+    def count(_):
+        return JsonLinesReader(filepath, index=True).count()
+
+    with ThreadPoolExecutor(8) as executor:
+        assert list(executor.map(count, range(8))) == [1000] * 8
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_csv_reader(tmp_path):
+    filepath = tmp_path / "licenses.csv"
+    filepath.write_text(
+        "ID,Title,Tags,Order\n"
+        'cc-by-4.0,"Creative Commons, Attribution",open; cc,1\n'
+        ",,,\n"
+        "mit,MIT,,x\n"
+        "apache-2.0,Apache,open,3\n"
+    )
+    reader = CsvReader(filepath, columns={
+        "ID": "id",
+        "Title": "title.en",
+        "Tags": {"field": "tags", "type": "list"},
+        "Order": {"field": "props.order", "type": "int"},
+    })
+
+    entries = list(reader.read())
+    assert entries[0].entry == {
+        "id": "cc-by-4.0",
+        "title": {"en": "Creative Commons, Attribution"},
+        "tags": ["open", "cc"],
+        "props": {"order": 1},
+    }
+    assert entries[1].errors  # invalid order
+    assert entries[2].entry["id"] == "apache-2.0"
+    # blank rows are skipped, but counted in the positions
+    assert [e.position for e in entries] == [1, 3, 4]
+    assert reader.count() == 3
+    assert [e.position for e in reader.read(position=3)] == [4]
+    # the partitions are ranges of positions, over the blank row as well
+    assert reader.partitions(2) == [(0, 2), (2, 4)]
+
+    with pytest.raises(ValueError):
+        CsvReader(filepath, columns={"ID": {"field": "id", "type": "date"}})
+    with pytest.raises(ReaderError):
+        list(CsvReader(filepath, columns={"Name": "title.en"}).read())
+
+
+def test_tsv_reader_chunks(tmp_path):
+    filepath = tmp_path / "languages.tsv"
+    filepath.write_text(
+        "id\ttitle.en\ttags\n"
+        "eng\tEnglish\trecommended\n"
+        "fra\tFrench\t\n"
+        "deu\tGerman\t\n"
+    )
+    reader = TsvReader(filepath)
+
+    assert next(reader.read()).entry == {
+        "id": "eng", "title": {"en": "English"}, "tags": "recommended"
+    }
+    chunks = list(reader.read_chunks(chunk_size=2))
+    assert [chunk.entry for chunk in chunks] == [
+        {
+            "columns": {
+                "id": ["eng", "fra"],
+                "title.en": ["English", "French"],
+                "tags": ["recommended", None],
+            },
+            "errors": [[], []],
+        },
+        {
+            "columns": {"id": ["deu"], "title.en": ["German"], "tags": [None]},
+            "errors": [[]],
+        },
+    ]
+    assert [chunk.position for chunk in chunks] == [2, 3]
+
+    # the chunks are the entries of a reader with a chunk size
+    reader = TsvReader(filepath, chunk_size=2)
+    assert [e.entry for e in reader.read()] == [c.entry for c in chunks]
+    assert reader.count() == 2
+    with pytest.raises(NotImplementedError):
+        reader.partitions(2)
+
+
+def test_csv_reader_chunks_errors(tmp_path):
+    filepath = tmp_path / "entries.csv"
+    filepath.write_text("id,order\na,1\nb,x\nc,3\n")
+    reader = CsvReader(filepath, columns={
+        "id": "id", "order": {"field": "props.order", "type": "int"}
+    })
+
+    chunks = list(reader.read_chunks(chunk_size=10))
+    assert len(chunks) == 1
+    # the invalid cell is left empty, the other rows are read
+    assert chunks[0].entry["columns"] == {
+        "id": ["a", "b", "c"], "props.order": [1, None, 3]
+    }
+    errors = chunks[0].entry["errors"]
+    assert errors[0] == errors[2] == []
+    assert len(errors[1]) == 1
+    assert errors[1][0].startswith("CsvReader: row 2: props.order: ")
+    assert not chunks[0].errors
+
+
+def _compress(data, compression):
+    """Compress some data in one of the supported formats."""
+    if compression == "bgzf":
+        return _bgzip(data)
+    if compression == "gzip":
+        # several members, as when gzip files are concatenated
+        half = len(data) // 2
+        return gzip.compress(data[:half]) + gzip.compress(data[half:])
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    if compression == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+@pytest.mark.parametrize(
+    "compression", [None, "gzip", "bgzf", "bz2", "xz", "zstd"]
+)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_open_file(tmp_path, compression, workers):
+    data = b"".join(f"line {idx}\n".encode() for idx in range(100000))
+    filepath = tmp_path / "file"
+    filepath.write_bytes(_compress(data, compression))
+
+    expected = "gzip" if compression == "bgzf" else compression
+    assert detect_compression(filepath) == expected
+    with open_file(filepath, workers=workers) as f:
+        assert f.read() == data
+    # closing before the end stops the decompression
+    with open_file(filepath, "rt", workers=workers) as f:
+        assert next(f) == "line 0\n"
+
+
+def test_open_file_truncated(tmp_path):
+    filepath = tmp_path / "file.gz"
+    filepath.write_bytes(gzip.compress(os.urandom(100000))[:-100])
+
+    with open_file(filepath) as f, pytest.raises(EOFError):
+        f.read()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compressed_file_readers(tmp_path, compression):
+    entries = [{"id": str(idx)} for idx in range(10)]
+
+    def _write(name, data):
+        filepath = tmp_path / name
+        filepath.write_bytes(_compress(data, compression))
+        return filepath
+
+    yaml_file = _write("entries.yaml", yaml.dump(entries).encode())
+    assert [e.entry for e in YamlReader(yaml_file).read()] == entries
+    assert YamlReader(yaml_file).count(position=4) == 6
+
+    rows = "".join(f"{entry['id']}\n" for entry in entries)
+    csv_file = _write("entries.csv", f"id\n{rows}".encode())
+    assert [e.entry for e in CsvReader(csv_file).read()] == entries
+
+    lines = "".join(f"{json.dumps(entry)}\n" for entry in entries).encode()
+    reader = JsonLinesReader(_write("entries.jsonl", lines))
+    read = list(reader.read())
+    assert [e.entry for e in read] == entries
+    # positions are offsets in the decompressed file
+    assert read[-1].position == len(lines)
+    assert [e.entry for e in reader.read(position=read[3].position)] == \
+        entries[4:]
+    assert reader.partitions(2) == [
+        (0, read[4].position), (read[4].position, len(lines))
+    ]
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for entry in entries:
+            content = json.dumps(entry).encode()
+            info = tarfile.TarInfo(f"{entry['id']}.json")
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    reader = TarReader(_write("entries.tar", buffer.getvalue()))
+    assert [json.loads(e.entry) for e in reader.read()] == entries
+    assert reader.count() == 10
+
+
+def test_reader_count_is_cheap(tmp_path):
+    archive = tmp_path / "archive.tar"
+    with tarfile.open(archive, "w") as tar:
+        tar.addfile(tarfile.TarInfo("a.xml"), io.BytesIO())
+    lines = tmp_path / "entries.jsonl"
+    lines.write_text('{"id": "a"}\n')
+
+    assert not TarReader(archive).count_is_cheap()
+    assert not JsonLinesReader(lines).count_is_cheap()
+    assert SimpleHTTPReader("{id}", ids=["a"]).count_is_cheap()
+
+    # cheap once the index is built
+    readers = [
+        TarReader(archive, index=True), JsonLinesReader(lines, index=True)
+    ]
+    for reader in readers:
+        assert not reader.count_is_cheap()
+        assert reader.count() == 1
+        assert reader.count_is_cheap()
+
+
+def test_dead_letter_reader(tmp_path):
+    filepath = tmp_path / "failed.jsonl.gz"
+    writer = DeadLetterWriter(filepath)
+    writer.write(StreamEntry(b"<record/>", ["error"]), stage="transform")
+    writer.write(StreamEntry({"id": "eng"}, ["error"]), stage="write")
+    writer.close()
+
+    reader = DeadLetterReader(filepath)
+    assert reader.count() == 2
+    entries = [stream_entry.entry for stream_entry in reader.read()]
+    assert entries == [b"<record/>", {"id": "eng"}]
+
+
+def test_composite_reader(app):
+    reader = CompositeReader(readers=[
+        {"type": "test", "args": {"origin": [1, 2]}},
+        {"type": "test", "args": {"origin": [3]}},
+    ])
+
+    entries = list(reader.read())
+    assert [e.entry for e in entries] == [1, 2, 3]
+    assert [e.position for e in entries] == [[0, 1], [0, 2], [1, 1]]
+    assert reader.count() == 3
+
+    # resume after the first entry
+    entries = list(reader.read(position=[0, 1]))
+    assert [e.entry for e in entries] == [2, 3]
+    assert reader.count(position=[0, 1]) == 2
+
+    assert reader.partitions(2) == [([0, 0], [1, 0]), ([1, 0], [2, 0])]
+
+
+def test_composite_reader_glob(app, tmp_path):
+    for idx in range(4):
+        with open(tmp_path / f"part-{idx}.yaml", "w") as f:
+            yaml.dump([{"id": f"{idx}-a"}, {"id": f"{idx}-b"}], f)
+
+    reader = CompositeReader(
+        origin=str(tmp_path / "part-*.yaml"),
+        reader={"type": "yaml"},
+        concurrency=2,
+    )
+
+    entries = [stream_entry.entry["id"] for stream_entry in reader.read()]
+    assert sorted(entries) == [
+        f"{idx}-{key}" for idx in range(4) for key in ("a", "b")
+    ]
+
+
+class MockResponse:
+    def __init__(self, status_code, content=b"content", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+@patch("requests.Session.get")
+def test_simple_http_reader_retry(get):
+    responses = {
+        "a": [MockResponse(503), MockResponse(200)],
+        "b": [MockResponse(429)] * 3,
+        "c": [MockResponse(404)],
+    }
+    get.side_effect = lambda url, **kwargs: responses[url].pop(0)
+
+    reader = SimpleHTTPReader(
+        "{id}", ids=["a", "b", "c"], retry={"sleep": lambda s: None}
+    )
+    entries = list(reader.read())
+
+    assert entries[0].entry == b"content"
+    assert not entries[0].errors
+    assert entries[1].errors == ["SimpleHTTPReader: b responded 429"]
+    assert entries[2].errors == ["SimpleHTTPReader: c responded 404"]
+    assert [e.position for e in entries] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@patch("requests.Session.get")
+def test_simple_http_reader_concurrent(get, ordered):
+    get.side_effect = lambda url, **kwargs: (
+        MockResponse(404) if url == "7" else MockResponse(200)
+    )
+    reader = SimpleHTTPReader(
+        "{id}", ids=[str(idx) for idx in range(20)], concurrency=4,
+        ordered=ordered,
+    )
+
+    entries = list(reader.read())
+    assert len(entries) == 20
+    assert sum(1 for e in entries if e.errors) == 1
+    if ordered:
+        assert [e.position for e in entries] == list(range(1, 21))
+        assert entries[7].errors == ["SimpleHTTPReader: 7 responded 404"]
+        assert reader.partitions(2) == [(0, 10), (10, 20)]
+    else:
+        assert all(e.position is None for e in entries)
+        with pytest.raises(NotImplementedError):
+            reader.partitions(2)
+
+
+def test_http_cache(tmp_path):
+    cache = HTTPCache(tmp_path / "http.db")
+    cache.set("a", "application/xml", '"1"', None, b"<a/>")
+    cache.set("b", None, None, None, b"<b/>")
+
+    assert cache.get("a", "application/xml") == ('"1"', None, b"<a/>")
+    assert cache.get("a") is None
+    # not cached without validators
+    assert cache.get("b") is None
+    cache.close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+@patch("requests.Session.get")
+def test_simple_http_reader_cache(get, tmp_path, concurrency):
+    contents = {"a": b"<a/>", "b": b"<b/>"}
+    sent = []
+
+    def _get(url, headers=None, **kwargs):
+        sent.append((url, dict(headers or {})))
+        etag = f'"{contents[url].decode()}"'
+        if url == "b":
+            validators = {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+            fresh = headers.get("If-Modified-Since") == \
+                validators["Last-Modified"]
+        else:
+            validators = {"ETag": etag}
+            fresh = headers.get("If-None-Match") == etag
+        if fresh:
+            return MockResponse(304, content=b"")
+        return MockResponse(200, content=contents[url], headers=validators)
+
+    get.side_effect = _get
+    cache = tmp_path / "http.db"
+
+    def _read(**kwargs):
+        sent.clear()
+        reader = SimpleHTTPReader(
+            "{id}", ids=["a", "b"], http_cache=cache,
+            concurrency=concurrency, **kwargs
+        )
+        return [(e.entry, e.position) for e in reader.read()]
+
+    assert _read() == [(b"<a/>", 1), (b"<b/>", 2)]
+    assert all(not headers for _, headers in sent)
+
+    # revalidated and read from the cache
+    assert _read() == [(b"<a/>", 1), (b"<b/>", 2)]
+    assert sorted(sent) == [
+        ("a", {"If-None-Match": '"<a/>"'}),
+        ("b", {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+    ]
+
+    contents["a"] = b"<a2/>"
+    assert _read(skip_unchanged=True) == [(b"<a2/>", 1)]
+
+
+def test_async_reader_adapter(app):
+    read = []
+
+    class RecordingReader(BaseReader):
+        def read(self, *args, **kwargs):
+            for value in self._origin:
+                read.append(value)
+                if value < 0:
+                    raise ReaderError("Negative value.")
+                yield StreamEntry(value)
+
+    async def first_entry(origin):
+        entries = AsyncReaderAdapter(
+            RecordingReader(origin), prefetch=2
+        ).read()
+        try:
+            first = await entries.__anext__()
+            # the reader keeps reading in the background, up to the prefetch
+            for _ in range(100):
+                if len(read) >= 4:
+                    break
+                await asyncio.sleep(0.01)
+            return first
+        finally:
+            await entries.aclose()
+
+    assert asyncio.run(first_entry(list(range(1, 11)))).entry == 1
+    assert read == [1, 2, 3, 4]
+
+    async def read_all(origin):
+        reader = AsyncReaderAdapter(RecordingReader(origin))
+        return [stream_entry.entry async for stream_entry in reader.read()]
+
+    assert asyncio.run(read_all([1, 2, 3])) == [1, 2, 3]
+    with pytest.raises(ReaderError):
+        asyncio.run(read_all([1, -1, 3]))
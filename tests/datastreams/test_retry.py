@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2022 CERN.
+#
+# Invenio-Vocabularies is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Data Streams retries tests."""
+
+import pytest
+
+from invenio_vocabularies.datastreams.errors import RetryableError
+from invenio_vocabularies.datastreams.retry import RetryPolicy
+
+
+class Flaky:
+    """Callable failing a given number of times."""
+
+    def __init__(self, failures, error=RetryableError):
+        """Constructor."""
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        """Fail until the number of failures is reached."""
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("transient")
+        return "ok"
+
+
+def test_retry_policy():
+    delays = []
+    policy = RetryPolicy(max_attempts=3, sleep=delays.append)
+
+    flaky = Flaky(2)
+    assert policy.call(flaky) == "ok"
+    assert flaky.calls == 3
+    assert len(delays) == 2
+
+    flaky = Flaky(3)
+    with pytest.raises(RetryableError):
+        policy.call(flaky)
+    assert flaky.calls == 3
+
+
+def test_retry_policy_not_retryable():
+    policy = RetryPolicy(sleep=lambda s: None)
+
+    flaky = Flaky(1, error=ValueError)
+    with pytest.raises(ValueError):
+        policy.call(flaky)
+    assert flaky.calls == 1
+
+    policy = RetryPolicy(
+        retry_on=["builtins.ValueError"], sleep=lambda s: None
+    )
+    assert policy.call(Flaky(1, error=ValueError)) == "ok"
+
+
+def test_retry_policy_budget():
+    policy = RetryPolicy(max_attempts=5, budget=2, sleep=lambda s: None)
+
+    assert policy.call(Flaky(2)) == "ok"
+    # the budget is shared by all the calls
+    flaky = Flaky(1)
+    with pytest.raises(RetryableError):
+        policy.call(flaky)
+    assert flaky.calls == 1
+
+
+def test_retry_policy_delay():
+    policy = RetryPolicy(backoff=1, max_backoff=5)
+
+    for attempt in range(1, 10):
+        assert 0 <= policy.delay(attempt) <= min(5, 2 ** (attempt - 1))
@@ -10,12 +10,15 @@
 
 from copy import deepcopy
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import yaml
+from invenio_records_resources.services.uow import UnitOfWork
 
 from invenio_vocabularies.datastreams import StreamEntry
-from invenio_vocabularies.datastreams.errors import WriterError
+from invenio_vocabularies.datastreams.errors import RetryableError, WriterError
+from invenio_vocabularies.datastreams.retry import RetryPolicy
 from invenio_vocabularies.datastreams.writers import ServiceWriter, YamlWriter
 
 
@@ -38,6 +41,34 @@ def test_service_writer_duplicate(lang_type, lang_data, service, identity):
     assert expected_error in err.value.args
 
 
+def test_service_writer_retry_created(
+    lang_type, lang_data, service, identity
+):
+    create = service.create
+    attempts = []
+
+    def create_then_fail(*args, **kwargs):
+        """Creates the entry, failing afterwards the first time."""
+        result = create(*args, **kwargs)
+        attempts.append(result)
+        if len(attempts) == 1:
+            raise RetryableError("Indexing failed.")
+        return result
+
+    writer = ServiceWriter(service, identity)
+    stream_entry = StreamEntry(lang_data)
+    with patch.object(service, "create", side_effect=create_then_fail):
+        RetryPolicy(sleep=lambda s: None).call(writer.write, stream_entry)
+
+    # the retry updated the entry created by the failed attempt
+    assert not stream_entry.errors
+    assert service.read(identity, ("languages", "eng"))
+
+    # other entries with the same id are still duplicates
+    with pytest.raises(WriterError):
+        writer.write(stream_entry=StreamEntry(lang_data))
+
+
 def test_service_writer_update_existing(
     lang_type, lang_data, service, identity
 ):
@@ -72,6 +103,50 @@ def test_service_writer_update_non_existing(
     assert dict(record, **updated_lang) == record
 
 
+def test_service_writer_skip_unchanged(
+    lang_type, lang_data, service, identity
+):
+    writer = ServiceWriter(service, identity, update=True, skip_unchanged=True)
+    lang = writer.write(stream_entry=StreamEntry(deepcopy(lang_data)))
+    record = service.read(identity, ("languages", lang.entry.id))
+    revision_id = record.data["revision_id"]
+
+    # same content, the entry is not written again
+    stream_entry = StreamEntry(deepcopy(lang_data))
+    writer.write(stream_entry=stream_entry)
+    assert stream_entry.filtered
+    record = service.read(identity, ("languages", lang.entry.id))
+    assert record.data["revision_id"] == revision_id
+
+    # changed content, the entry is updated
+    updated_lang = deepcopy(lang_data)
+    updated_lang["tags"].append("updated")
+    stream_entry = StreamEntry(updated_lang)
+    writer.write(stream_entry=stream_entry)
+    assert not stream_entry.filtered
+    record = service.read(identity, ("languages", lang.entry.id))
+    assert "updated" in record.data["tags"]
+
+
+def test_service_writer_validate(lang_type, lang_data, service, identity):
+    writer = ServiceWriter(service, identity)
+    stream_entry = StreamEntry(lang_data)
+    assert writer.validate(stream_entry) is stream_entry
+
+    invalid = dict(deepcopy(lang_data), tags="recommended")
+    del invalid["type"]
+    with pytest.raises(WriterError) as err:
+        writer.validate(StreamEntry(invalid))
+    assert sorted(err.value.args[0]) == [
+        "tags: Not a valid list.",
+        "type: Missing data for required field.",
+    ]
+
+    # nothing was created
+    with pytest.raises(Exception):
+        service.read(identity, ("languages", "eng"))
+
+
 def test_yaml_writer():
     filepath = Path('writer_test.yaml')
     test_output = [
@@ -87,3 +162,59 @@ def test_yaml_writer():
         assert yaml.safe_load(file) == test_output
 
     filepath.unlink()
+
+
+def test_service_writer_write_many(lang_type, lang_data, service, identity):
+    writer = ServiceWriter(service, identity)
+    other_lang = dict(deepcopy(lang_data), id="fra")
+    entries = [StreamEntry(lang_data), StreamEntry(other_lang)]
+    writer.write_many(entries)
+    assert not any(entry.errors for entry in entries)
+
+    # the duplicate makes the batch fall back to one by one writes
+    new_lang = dict(deepcopy(lang_data), id="spa")
+    entries = [StreamEntry(lang_data), StreamEntry(new_lang)]
+    writer.write_many(entries)
+    assert entries[0].errors
+    assert not entries[1].errors
+    assert service.read(identity, ("languages", "spa"))
+
+
+def test_service_writer_write_many_commit_failed(
+    lang_type, lang_data, service, identity
+):
+    commit = UnitOfWork.commit
+    commits = []
+
+    def commit_then_fail(self):
+        """Commits, failing afterwards the first time."""
+        commit(self)
+        commits.append(self)
+        if len(commits) == 1:
+            raise RetryableError("Indexing failed.")
+
+    writer = ServiceWriter(service, identity)
+    other_lang = dict(deepcopy(lang_data), id="fra")
+    entries = [StreamEntry(lang_data), StreamEntry(other_lang)]
+    with patch.object(UnitOfWork, "commit", commit_then_fail):
+        writer.write_many(entries, retry=RetryPolicy(sleep=lambda s: None))
+
+    # the committed entries are updated, not reported as duplicates
+    assert not any(entry.errors for entry in entries)
+    assert service.read(identity, ("languages", "fra"))
+
+
+def test_yaml_writer_write_many():
+    filepath = Path('writer_test.yaml')
+    test_output = [
+        {"key_one": [{"inner_one": 1}]},
+        {"key_two": [{"inner_two": "two"}]}
+    ]
+
+    writer = YamlWriter(filepath=filepath)
+    writer.write_many([StreamEntry(output) for output in test_output])
+
+    with open(filepath) as file:
+        assert yaml.safe_load(file) == test_output
+
+    filepath.unlink()
@@ -93,3 +93,15 @@ def test_task_creation(app, client_with_credentials, h):
         p_read.assert_called()
         p_apply.assert_called()
         p_write.assert_called()
+
+    resp = client.get(f"/vocabularies/tasks/{resp.json['id']}", headers=h)
+    assert resp.status_code == 200
+    assert resp.json["status"] == "completed"
+    assert resp.json["processed"] == 1
+    assert resp.json["errored"] == 0
+
+
+def test_task_not_found(app, client_with_credentials, h):
+    client = client_with_credentials
+    resp = client.get("/vocabularies/tasks/not-a-task", headers=h)
+    assert resp.status_code == 404
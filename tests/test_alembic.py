@@ -38,6 +38,9 @@ def test_alembic(app, database):
     assert 'vocabularies_metadata' in tables
     assert 'vocabularies_types' in tables
     assert 'vocabularies_schemes' in tables
+    assert 'vocabularies_datastream_checkpoints' in tables
+    assert 'vocabularies_datastream_hashes' in tables
+    assert 'vocabularies_datastream_tasks' in tables
 
     # Specific vocabularies models
     assert 'subject_metadata' in tables
@@ -8,6 +8,7 @@
 
 """CLI Module tests."""
 
+import io
 import tarfile
 from pathlib import Path
 from unittest.mock import patch
@@ -145,6 +146,27 @@ def test_process(app, names_tar_file, names_service):
     assert list(results.hits)[0]["identifiers"][0]["identifier"] == orcid
 
 
+def test_process_async(app, name_xml, names_service, tmp_path):
+    # a name not imported by the other tests
+    orcid = "0000-0002-1825-0097"
+    content = name_xml.replace("0000-0001-8135-3489", orcid).encode()
+    filename = tmp_path / "names.tar.gz"
+    with tarfile.open(filename, "w:gz") as tar:
+        info = tarfile.TarInfo("name.xml")
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
+
+    config = get_config_for_ds(vocabulary="names", origin=filename)
+    success, errored, filtered = _process_vocab(config, asynchronous=True)
+    assert (success, errored, filtered) == (1, 0, 0)
+    Name.index.refresh()
+
+    results = names_service.search(
+        system_identity, q=f"identifiers.identifier:{orcid}"
+    )
+    assert results.total == 1
+
+
 def test_update_cmd(app, names_tar_file):
     # cli update
     runner = CliRunner()
@@ -155,3 +177,18 @@ def test_update_cmd(app, names_tar_file):
         obj=obj
     )
     assert result.exit_code == 0
+
+
+def test_import_cmd_dry_run(app, names_tar_file):
+    runner = CliRunner()
+    obj = ScriptInfo(create_app=lambda x: app)
+    result = runner.invoke(
+        vocabularies,
+        [
+            'import', '-v', 'names', '--origin', names_tar_file.absolute(),
+            '--dry-run'
+        ],
+        obj=obj
+    )
+    assert result.exit_code == 0
+    assert "Vocabulary names validated" in result.output